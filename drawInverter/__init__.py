@@ -1,2 +1,13 @@
 from .drawTransistor import drawTransistor
 from .drawInverter import drawInverter
+from .drawInverterChain import drawInverterChain, drawRingOscillator, drawBufferArray
+from .checkConnectivity import (
+    bufferArrayProbes,
+    chainProbes,
+    checkConnectivity,
+    componentLayout,
+    inverterProbes,
+    transistorProbes,
+)
+from .fingerprint import layoutFingerprint
+from .liveView import watchParams, sendToViewer, LiveViewServer
@@ -0,0 +1,261 @@
+import os
+import tempfile
+
+import klayout.db as kdb
+
+from .drawInverter import _inverter_straps
+from .drawInverterChain import _chain_params, drawInverterChain
+from .transistorParams import transistorParams
+
+# gf180mcu gds layer numbers
+LAYERS = {
+    "comp": (22, 0),
+    "poly2": (30, 0),
+    "contact": (33, 0),
+    "metal1": (34, 0),
+    "via1": (35, 0),
+    "metal2": (36, 0),
+}
+
+
+def checkConnectivity(component, probes: dict) -> dict:
+    # probes: net name -> list of (layer, x, y) points in um that must be on that net
+    # layer is one of LAYERS or "sd" (comp not covered by poly2)
+
+    layout = componentLayout(component)
+
+    # the layout of the caller is flattened on a copy, never in place
+    if layout is component:
+        layout = layout.dup()
+
+    l2n, regions = _extract_nets(layout)
+
+    nets = {}
+    opens = []
+
+    for name, points in probes.items():
+        ids = []
+        for layer, x, y in points:
+            net = l2n.probe_net(regions[layer], kdb.DPoint(x, y))
+            ids.append(None if net is None else net.cluster_id)
+
+        nets[name] = ids
+
+        # a probe without shape, or probes landing on different nets
+        if None in ids or len(set(ids)) > 1:
+            opens.append(name)
+
+    shorts = []
+    names = list(nets)
+
+    for i, a in enumerate(names):
+        for b in names[i + 1 :]:
+            if (set(nets[a]) & set(nets[b])) - {None}:
+                shorts.append((a, b))
+
+    return {"opens": opens, "shorts": shorts, "nets": nets}
+
+
+def transistorProbes(w_gate: float = 2, folding: int = 1) -> dict:
+    # terminals of drawTransistor in its own coordinates, bulk ties belong to the source
+
+    params = transistorParams("Nmos", w_gate, folding)
+    w_gate_folding = params.w_gate_folding
+    nf = params.nf
+
+    # gate i spans x = [i * 0.8, i * 0.8 + 0.28], diffusion j ends where gate j starts
+    finger = params.finger
+    mid = w_gate_folding / 2
+
+    gates = [("poly2", i * finger + 0.14, mid) for i in range(nf)]
+    diffusions = [("sd", j * finger - 0.26, mid) for j in range(nf + 1)]
+
+    return {
+        "G": gates + [("poly2", 0.025 + 0.19, w_gate_folding + 0.41)],
+        "S": diffusions[0::2]
+        + [
+            ("metal1", -0.375 + 0.19, -0.1),
+            ("metal1", -3 * (0.36 + 0.01) + 0.18, mid),
+            ("metal1", params.bulk_right_x + 0.37 + 0.18, mid),
+        ],
+        "D": diffusions[1::2] + [("metal1", 0.425 + 0.19, w_gate_folding + 0.1)],
+    }
+
+
+def inverterProbes(
+    w_gate_Nmos: float = 2,
+    folding_Nmos: int = 1,
+    w_gate_Pmos: float = 2,
+    folding_Pmos: int = 1,
+) -> dict:
+    # terminals of drawInverter: in, out and the bulk tied VSS / VDD sources
+
+    nmos_params = transistorParams("Nmos", w_gate_Nmos, folding_Nmos)
+    pmos_params = transistorParams("Pmos", w_gate_Pmos, folding_Pmos)
+    w_gate_folding_N = nmos_params.w_gate_folding
+
+    nmos = transistorProbes(w_gate_Nmos, folding_Nmos)
+
+    # pull up is mirrored around its gate center and moved above the pull down
+    pmos = {
+        name: [
+            (layer, x, pmos_params.w_gate_folding - y + w_gate_folding_N + 2)
+            for layer, x, y in points
+        ]
+        for name, points in transistorProbes(w_gate_Pmos, folding_Pmos).items()
+    }
+
+    # middle of the input strap pieces and of the end of the output strap
+    straps = _inverter_straps(nmos_params, pmos_params)
+    in_y = straps["in_y"] + 0.19
+    in_x = straps["in_x"]
+
+    return {
+        "in": nmos["G"]
+        + pmos["G"]
+        + [("poly2", in_x + 1, in_y), ("metal1", in_x + 0.19, in_y)],
+        "out": nmos["D"]
+        + pmos["D"]
+        + [("metal1", straps["out_x"] - 0.19, straps["out_y"] + 0.19)],
+        "VSS": nmos["S"],
+        "VDD": pmos["S"],
+    }
+
+
+def chainProbes(
+    stages: int = 3,
+    w_gate_Nmos: float = 2,
+    folding_Nmos: int = 1,
+    w_gate_Pmos: float = 2,
+    folding_Pmos: int = 1,
+    ring: bool = False,
+    stage_space: float = 0.6,
+    rail_width: float = 0.6,
+) -> dict:
+    # nets of drawInverterChain: in, n1 .. n<stages - 1> between the stages,
+    # out, and the VSS / VDD rails; a ring closes out on in, its nets are
+    # n0 .. n<stages - 1>, n<i> driving stage i
+
+    params = _chain_params(
+        w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos, stage_space, rail_width
+    )
+    pitch = params["pitch"]
+
+    inverter = inverterProbes(w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos)
+
+    def stage(i, name):
+        return [(layer, x + i * pitch, y) for layer, x, y in inverter[name]]
+
+    def rail(i, y):
+        return ("metal1", params["x_min"] + (i + 0.5) * pitch, y + rail_width / 2)
+
+    if ring:
+        names = [f"n{i}" for i in range(stages)]
+    else:
+        names = ["in"] + [f"n{i}" for i in range(1, stages)] + ["out"]
+
+    nets = {name: [] for name in names}
+    nets["VSS"] = []
+    nets["VDD"] = []
+
+    for i in range(stages):
+        nets[names[i]] += stage(i, "in")
+        nets[names[(i + 1) % len(names)]] += stage(i, "out")
+
+        nets["VSS"] += stage(i, "VSS") + [rail(i, params["vss_y"])]
+        nets["VDD"] += stage(i, "VDD") + [rail(i, params["vdd_y"])]
+
+    # middle of the metal1 wires between the stages
+    wire_y = params["strap_y"] + params["width_metal1_conection"] / 2
+    for i in range(1, stages):
+        wire_x = (params["out_x"] + pitch + params["in_x"]) / 2 + (i - 1) * pitch
+        nets[names[i]].append(("metal1", wire_x, wire_y))
+
+    if ring:
+        last_out_x = (stages - 1) * pitch + params["out_x"]
+        nets["n0"].append(("metal2", (params["in_x"] + last_out_x) / 2, wire_y))
+
+    return nets
+
+
+def bufferArrayProbes(
+    rows: int = 2,
+    columns: int = 2,
+    stages: int = 2,
+    w_gate_Nmos: float = 2,
+    folding_Nmos: int = 1,
+    w_gate_Pmos: float = 2,
+    folding_Pmos: int = 1,
+    buffer_space: float = 2,
+) -> dict:
+    # nets of drawBufferArray, the chain nets of every buffer prefixed with its
+    # row and column, like r0c1_in
+
+    buffer = drawInverterChain(
+        stages, w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos
+    )
+    dx = buffer.xsize + buffer_space
+    dy = buffer.ysize + buffer_space
+
+    chain = chainProbes(stages, w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos)
+
+    return {
+        f"r{row}c{column}_{name}": [
+            (layer, x + column * dx, y + row * dy) for layer, x, y in points
+        ]
+        for row in range(rows)
+        for column in range(columns)
+        for name, points in chain.items()
+    }
+
+
+def componentLayout(component) -> kdb.Layout:
+    # kdb.Layout of a gdsfactory component, a layout is returned as is
+
+    if isinstance(component, kdb.Layout):
+        return component
+
+    # nested pdk cells of both transistors share names, a flat copy keeps the
+    # gds from merging them
+    flat = component.flatten()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gdspath = os.path.join(tmp, "component.gds")
+        flat.write_gds(gdspath)
+
+        layout = kdb.Layout()
+        layout.read(gdspath)
+
+    return layout
+
+
+def _extract_nets(layout):
+    top = layout.top_cell()
+
+    # builders are small, a flat netlist keeps every probe in the top circuit
+    top.flatten(True)
+
+    l2n = kdb.LayoutToNetlist(kdb.RecursiveShapeIterator(layout, top, []))
+
+    regions = {
+        name: l2n.make_layer(layout.layer(*gds_layer), name)
+        for name, gds_layer in LAYERS.items()
+    }
+
+    # source / drain diffusion is split by the gates
+    sd = regions["comp"] - regions["poly2"]
+    l2n.register(sd, "sd")
+    regions["sd"] = sd
+
+    for name in ("sd", "poly2", "contact", "metal1", "via1", "metal2"):
+        l2n.connect(regions[name])
+
+    l2n.connect(regions["contact"], regions["sd"])
+    l2n.connect(regions["contact"], regions["poly2"])
+    l2n.connect(regions["contact"], regions["metal1"])
+    l2n.connect(regions["via1"], regions["metal1"])
+    l2n.connect(regions["via1"], regions["metal2"])
+
+    l2n.extract_netlist()
+
+    return l2n, regions
@@ -1,6 +1,7 @@
 import gdsfactory as gf
 
 from .drawTransistor import drawTransistor
+from .transistorParams import transistorParams
 
 
 @gf.cell
@@ -12,95 +13,81 @@ def drawInverter(
 ) -> gf.Component:
     top = gf.Component("TOP")
 
-    params = {
-        "w_gate_Nmos": w_gate_Nmos,
-        "folding_Nmos": folding_Nmos,
-        "w_gate_Pmos": w_gate_Pmos,
-        "folding_Pmos": folding_Pmos,
-        "w_gate_folding_N": (
-            w_gate_Nmos / folding_Nmos if folding_Nmos > 1 else folding_Nmos
-        ),
-        "nf_N": (folding_Nmos if folding_Nmos > 1 else 1),
-        "w_gate_folding_P": (
-            w_gate_Pmos / folding_Pmos if folding_Pmos > 1 else w_gate_Pmos
-        ),
-        "nf_P": (folding_Pmos if folding_Pmos > 1 else 1),
-        "inter_sd_l": 0.52,
-        "l_gate": 0.28,
-        "metal_s": "metal1",
-        "width_metal1_conection": 0.38,
-    }
+    # derived dimensions come from the same objects drawTransistor uses
+    nmos = transistorParams("Nmos", w_gate_Nmos, folding_Nmos)
+    pmos = transistorParams("Pmos", w_gate_Pmos, folding_Pmos)
+
+    straps = _inverter_straps(nmos, pmos)
 
-    _add_transistors(top, params)
+    _add_transistors(top, nmos, pmos)
 
-    _add_drain(top, params)
+    _add_drain(top, nmos, straps)
 
-    _add_poly(top, params)
+    _add_poly(top, nmos, straps)
 
-    _add_contact(top, params)
+    _add_contact(top, nmos, straps)
 
     return top
 
 
-def _add_transistors(top, params):
-    w_gate_Nmos = params["w_gate_Nmos"]
-    folding_Nmos = params["folding_Nmos"]
-    w_gate_Pmos = params["w_gate_Pmos"]
-    folding_Pmos = params["folding_Pmos"]
-    w_gate_folding_N = params["w_gate_folding_N"]
-    w_gate_folding_P = params["w_gate_folding_P"]
+def _inverter_straps(nmos, pmos):
+    # input and output straps of drawInverter, one metal1 width high: the input
+    # poly2 strap and its metal1 pad start at in_x, the output metal1 strap
+    # spans out_x0 .. out_x. Chains wire and probe the inverter from here
+
+    out_m1_nf = max(nmos.nf, pmos.nf)
+    out_x0 = nmos.drain_x[0] + 0.38
+
+    return {
+        "in_x": 0.025 - 2,
+        "in_y": nmos.w_gate_folding + 0.8,
+        "out_x0": out_x0,
+        "out_x": out_x0 + (out_m1_nf + 3) * nmos.inter_sd_l,
+        "out_y": nmos.w_gate_folding + 0.81,
+    }
+
 
+def _add_transistors(top, nmos, pmos):
     # Nmos  pull_down
-    pull_down = top << drawTransistor("Nmos", w_gate_Nmos, folding_Nmos)
-    pull_up = top << drawTransistor("Pmos", w_gate_Pmos, folding_Pmos)
+    pull_down = top << drawTransistor("Nmos", nmos.w_gate, nmos.folding)
+    pull_up = top << drawTransistor("Pmos", pmos.w_gate, pmos.folding)
 
-    pull_up.mirror_y(y0=w_gate_folding_P / 2)
-    pull_up.movey(w_gate_folding_N + 2)
+    pull_up.mirror_y(y0=pmos.w_gate_folding / 2)
+    pull_up.movey(nmos.w_gate_folding + 2)
 
 
-def _add_drain(top, params):
-    w_gate_folding_N = params["w_gate_folding_N"]
-    nf_N = params["nf_N"]
-    nf_P = params["nf_P"]
-    inter_sd_l = params["inter_sd_l"]
-    l_gate = params["l_gate"]
-    metal_s = params["metal_s"]
+def _add_drain(top, nmos, straps):
+    metal_s = nmos.metal_s
 
     # 0.84 es la distania en las que quedas los m1
 
-    # out
+    # out, sobre el primer drain del pull down
     drain_out = top << gf.components.rectangle(size=(0.38, 0.84), layer=metal_s)
-    drain_out.move([0.075 + 0.07 + l_gate, w_gate_folding_N + 0.58])
-
-    out_m1_nf = nf_N if nf_N >= nf_P else nf_P
+    drain_out.move([nmos.drain_x[0], nmos.w_gate_folding + 0.58])
 
     drain_out2 = top << gf.components.rectangle(
-        size=((out_m1_nf + 3) * inter_sd_l, 0.38), layer=metal_s
+        size=(straps["out_x"] - straps["out_x0"], 0.38), layer=metal_s
     )
-    drain_out2.move([0.075 + 0.07 + l_gate + 0.38, w_gate_folding_N + 0.81])
-
+    drain_out2.move([straps["out_x0"], straps["out_y"]])
 
-def _add_poly(top, params):
-    w_gate_folding_N = params["w_gate_folding_N"]
 
+def _add_poly(top, nmos, straps):
     # 0.84 es la distania en las que quedas los m1
 
     poly_in = top << gf.components.rectangle(size=(0.38, 0.8), layer="poly2")
-    poly_in.move([0.025, w_gate_folding_N + 0.6])
+    poly_in.move([0.025, nmos.w_gate_folding + 0.6])
 
     poly_in2 = top << gf.components.rectangle(size=(2, 0.38), layer="poly2")
-    poly_in2.move([0.025 - 2, w_gate_folding_N + 0.8])
+    poly_in2.move([straps["in_x"], straps["in_y"]])
 
 
-def _add_contact(top, params):
-    w_gate_folding_N = params["w_gate_folding_N"]
-    metal_s = params["metal_s"]
-    width_metal1_conection = params["width_metal1_conection"]
+def _add_contact(top, nmos, straps):
+    width_metal1_conection = nmos.width_metal1_conection
 
     contactPoly = top << gf.components.rectangle(
-        size=(width_metal1_conection, width_metal1_conection), layer=metal_s
+        size=(width_metal1_conection, width_metal1_conection), layer=nmos.metal_s
     )
-    contactPoly.move([0.025 - 2, w_gate_folding_N + 0.8])
+    contactPoly.move([straps["in_x"], straps["in_y"]])
 
     contactP_m1 = top << gf.components.rectangle(size=(0.22, 0.22), layer="contact")
-    contactP_m1.move([0.025 - 2 + 0.08, w_gate_folding_N + 0.8 + 0.08])
+    contactP_m1.move([straps["in_x"] + 0.08, straps["in_y"] + 0.08])
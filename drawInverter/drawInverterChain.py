@@ -0,0 +1,171 @@
+import gdsfactory as gf
+
+from .drawInverter import drawInverter, _inverter_straps
+from .transistorParams import transistorParams
+
+
+@gf.cell
+def drawInverterChain(
+    stages: int = 3,
+    w_gate_Nmos: float = 2,
+    folding_Nmos: int = 1,
+    w_gate_Pmos: float = 2,
+    folding_Pmos: int = 1,
+    ring: bool = False,
+    stage_space: float = 0.6,
+    rail_width: float = 0.6,
+) -> gf.Component:
+    # all stages share one inverter cell, placed with array references so the
+    # cell size doesn't grow with the number of stages
+
+    top = gf.Component("CHAIN")
+
+    params = _chain_params(
+        w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos, stage_space, rail_width
+    )
+
+    inverter = drawInverter(w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos)
+    top.add_array(inverter, columns=stages, rows=1, spacing=(params["pitch"], 0))
+
+    _add_rails(top, params, stages)
+
+    _add_stage_wires(top, params, stages)
+
+    if ring:
+        _add_feedback(top, params, stages)
+
+    return top
+
+
+@gf.cell
+def drawRingOscillator(
+    stages: int = 5,
+    w_gate_Nmos: float = 2,
+    folding_Nmos: int = 1,
+    w_gate_Pmos: float = 2,
+    folding_Pmos: int = 1,
+) -> gf.Component:
+    if stages < 3 or stages % 2 == 0:
+        raise ValueError(
+            f"a ring oscillator needs an odd number of stages >= 3, got {stages}"
+        )
+
+    top = gf.Component("RING")
+    top << drawInverterChain(
+        stages, w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos, ring=True
+    )
+
+    return top
+
+
+@gf.cell
+def drawBufferArray(
+    rows: int = 2,
+    columns: int = 2,
+    stages: int = 2,
+    w_gate_Nmos: float = 2,
+    folding_Nmos: int = 1,
+    w_gate_Pmos: float = 2,
+    folding_Pmos: int = 1,
+    buffer_space: float = 2,
+) -> gf.Component:
+    top = gf.Component("BUFFERS")
+
+    buffer = drawInverterChain(
+        stages, w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos
+    )
+
+    top.add_array(
+        buffer,
+        columns=columns,
+        rows=rows,
+        spacing=(buffer.xsize + buffer_space, buffer.ysize + buffer_space),
+    )
+
+    return top
+
+
+def _chain_params(
+    w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos, stage_space, rail_width
+):
+    nmos = transistorParams("Nmos", w_gate_Nmos, folding_Nmos)
+    pmos = transistorParams("Pmos", w_gate_Pmos, folding_Pmos)
+
+    straps = _inverter_straps(nmos, pmos)
+    in_x = straps["in_x"]
+    out_x = straps["out_x"]
+
+    # the output strap sticks out of the transistors on the right
+    inverter = drawInverter(w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos)
+    x_min = min(inverter.xmin, in_x)
+    x_max = max(inverter.xmax, out_x)
+
+    return {
+        "pitch": x_max - x_min + stage_space,
+        "x_min": x_min,
+        "in_x": in_x,
+        "out_x": out_x,
+        "strap_y": straps["in_y"],
+        # source straps of both transistors end 0.58 away from their gates
+        "vss_y": -0.58 - rail_width,
+        "vdd_y": nmos.w_gate_folding + 2 + pmos.w_gate_folding + 0.58,
+        "rail_width": rail_width,
+        "width_metal1_conection": nmos.width_metal1_conection,
+    }
+
+
+def _add_rails(top, params, stages):
+    pitch = params["pitch"]
+    rail_width = params["rail_width"]
+
+    # one rail piece per stage, abutted with the next one
+    rail = gf.components.rectangle(size=(pitch, rail_width), layer="metal1")
+
+    vss = top.add_array(rail, columns=stages, rows=1, spacing=(pitch, 0))
+    vss.move([params["x_min"], params["vss_y"]])
+
+    vdd = top.add_array(rail, columns=stages, rows=1, spacing=(pitch, 0))
+    vdd.move([params["x_min"], params["vdd_y"]])
+
+
+def _add_stage_wires(top, params, stages):
+    if stages < 2:
+        return
+
+    pitch = params["pitch"]
+    width_metal1_conection = params["width_metal1_conection"]
+
+    # from the output strap of a stage to the input contact of the next one
+    wire = gf.components.rectangle(
+        size=(
+            pitch + params["in_x"] + width_metal1_conection - params["out_x"],
+            width_metal1_conection,
+        ),
+        layer="metal1",
+    )
+
+    wires = top.add_array(wire, columns=stages - 1, rows=1, spacing=(pitch, 0))
+    wires.move([params["out_x"], params["strap_y"]])
+
+
+def _add_feedback(top, params, stages):
+    pitch = params["pitch"]
+    strap_y = params["strap_y"]
+    width_metal1_conection = params["width_metal1_conection"]
+
+    # metal2 over the stages, from the last output back to the first input
+    last_out_x = (stages - 1) * pitch + params["out_x"]
+
+    feedback = top << gf.components.rectangle(
+        size=(last_out_x - params["in_x"], width_metal1_conection + 0.01),
+        layer="metal2",
+    )
+    feedback.move([params["in_x"], strap_y])
+
+    via = gf.components.rectangle(size=(0.26, 0.26), layer="via1")
+
+    via_in = top << via
+    via_in.move([params["in_x"] + 0.06, strap_y + 0.06])
+
+    via_out = top << via
+    via_out.move([last_out_x - width_metal1_conection + 0.06, strap_y + 0.07])
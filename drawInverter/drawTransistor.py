@@ -1,108 +1,87 @@
 import gf180
+import gdstk
 import gdsfactory as gf
 
+from .transistorParams import transistorParams
+
 
 @gf.cell
 def drawTransistor(
     typeTransistor: str = "Nmos",  #  opcion de Nmos y Pmos
     w_gate: float = 2,
     folding: int = 1,
+    merge_shapes: bool = False,
 ) -> gf.Component:
     # desde el origen (0.0) el primer source esta a la izquierda (-)
 
-    # ej. foldding = 2, W = 4, x = 2     donde x es la cantida de finger a usar
-
-    params = {
-        "l_gate": 0.28,
-        "w_gate": (w_gate / folding if folding > 1 else w_gate),
-        "sd_con_col": 1,  # numero de columnas de contacto en la difusion
-        "inter_sd_l": 0.52,  # largo del canal entre finger
-        "nf": (folding if folding > 1 else 1),
-        "grw": 0.38,
-        "volt": "3.3V",
-        "bulk": "None",
-        "con_bet_fin": 1,
-        "gate_con_pos": "top",  # alternating   #bottom
-        "interdig": 1,
-        "patt": "",
-        "deepnwell": 0,
-        "pcmpgr": 0,
-        "label": 0,
-        "sub_label": "",
-        "patt_label": 0,
-        "metal_s": "metal1",
-        "width_metal1_conection": 0.38,
-        "DistanceFisrt_metal1_conection": -0.375,
-        "min_distance_between_m1": 0.26,
-        "bulk_plus": ("pplus" if typeTransistor == "Nmos" else "nplus"),
-        "typeTransistor": typeTransistor,
-    }
+    params = transistorParams(typeTransistor, w_gate, folding)
 
     transistor = gf.Component(typeTransistor)
 
-    _add_fets(transistor, params)
+    fet = _add_fets(transistor, params)
     _add_source(transistor, params)
     _add_drain(transistor, params)
     _add_poly_connect(transistor, params)
     _add_bulk_contacts(transistor, params)
     _add_bulk(transistor, params)
 
+    if merge_shapes:
+        _merge_shapes(transistor, fet)
+
     return transistor
 
 
 def _add_fets(transistor, params):
-    typeTransistor = params["typeTransistor"]
-
-    transistor_parameters = {
-        "l_gate": params["l_gate"],
-        "w_gate": params["w_gate"],
-        "sd_con_col": params["sd_con_col"],
-        "inter_sd_l": params["inter_sd_l"],
-        "nf": params["nf"],
-        "grw": params["grw"],
-        "volt": params["volt"],
-        "bulk": params["bulk"],
-        "con_bet_fin": params["con_bet_fin"],
-        "gate_con_pos": params["gate_con_pos"],
-        "interdig": params["interdig"],
-        "patt": params["patt"],
-        "deepnwell": params["deepnwell"],
-        "pcmpgr": params["pcmpgr"],
-        "label": params["label"],
-        "sub_label": params["sub_label"],
-        "patt_label": params["patt_label"],
-    }
-
-    if typeTransistor == "Nmos":
-        transistor << gf180.nfet(**transistor_parameters)
+    if params.typeTransistor == "Nmos":
+        return transistor << gf180.nfet(**params.fetParameters())
 
     else:
-        transistor << gf180.pfet(**transistor_parameters)
+        return transistor << gf180.pfet(**params.fetParameters())
+
+
+def _merge_shapes(transistor, fet):
+    # los rectangulos propios (straps, bulk, contactos) se aplanan y se unen por
+    # capa en poligonos minimos, el fet de gf180 queda como referencia
+
+    shapes = {}
+    polygons_before = 0
+
+    for ref in list(transistor.references):
+        if ref is fet:
+            continue
+
+        for layer, polygons in ref.get_polygons(by_spec=True).items():
+            shapes.setdefault(layer, []).extend(polygons)
+            polygons_before += len(polygons)
+
+        transistor.remove(ref)
+
+    polygons_after = 0
+
+    for (layer, datatype), polygons in shapes.items():
+        merged = gdstk.boolean(polygons, [], "or", layer=layer, datatype=datatype)
+        for polygon in merged:
+            transistor.add_polygon(polygon.points, layer=(layer, datatype))
+        polygons_after += len(merged)
+
+    transistor.info["polygons_before"] = polygons_before
+    transistor.info["polygons_after"] = polygons_after
 
 
 def _add_source(transistor, params):
-    nf = params["nf"]
-    l_gate = params["l_gate"]
-    inter_sd_l = params["inter_sd_l"]
+    nf = params.nf
 
-    metal_s = params["metal_s"]
-    width_metal1_conection = params["width_metal1_conection"]
-    DistanceFisrt_metal1_conection = params["DistanceFisrt_metal1_conection"]
-    min_distance_between_m1 = params["min_distance_between_m1"]
+    metal_s = params.metal_s
+    width_metal1_conection = params.width_metal1_conection
+    DistanceFisrt_metal1_conection = params.DistanceFisrt_metal1_conection
+    min_distance_between_m1 = params.min_distance_between_m1
 
     if nf >= 2:
         # Add one horizontal source
         ###########################
 
-        # nf par -> sources = nf -1  and drain = nf -2      |   nf impar -> sources = nf -1  and drain = nf -1       #cantidad de sources y drains al hacer foldding
-
-        temp_nf = nf if nf % 2 == 0 else nf - 1
-
         horizontal_fet_source = transistor << gf.components.rectangle(
-            size=(
-                2 * (inter_sd_l - 0.07) + (temp_nf - 1) * inter_sd_l + temp_nf * l_gate,
-                width_metal1_conection,
-            ),
+            size=(params.source_h_length, width_metal1_conection),
             layer=metal_s,
         )  # 3.72
         horizontal_fet_source.movex(DistanceFisrt_metal1_conection)
@@ -119,29 +98,9 @@ def _add_source(transistor, params):
             size=(0.38, min_distance_between_m1), layer=metal_s
         )
 
-        # Number of sources with folding
-        vertical_source_total = 2 + (nf - 2) // 2
-
-        for i in range(vertical_source_total):
+        for source_dx in params.source_x:
             source = transistor << vertical_fet_source
-
-            firstM = 0 if i == 0 else 0.07
-            secondM = 0.07 if i > 1 else 0
-
-            source_dx = (
-                DistanceFisrt_metal1_conection
-                + firstM
-                + secondM * (i - 1)
-                + i * (width_metal1_conection + 0.07 + inter_sd_l)
-                + 2 * i * l_gate
-            )
-            source_dy = -min_distance_between_m1 + 0.06
-            source.move(
-                [
-                    source_dx,
-                    source_dy,
-                ]
-            )
+            source.move([source_dx, -min_distance_between_m1 + 0.06])
 
     else:
         # Add one vertical source
@@ -154,14 +113,13 @@ def _add_source(transistor, params):
 
 
 def _add_drain(transistor, params):
-    nf = params["nf"]
-    l_gate = params["l_gate"]
-    w_gate_folding = params["w_gate"]
-    inter_sd_l = params["inter_sd_l"]
+    nf = params.nf
+    l_gate = params.l_gate
+    w_gate_folding = params.w_gate_folding
 
-    metal_s = params["metal_s"]
-    width_metal1_conection = params["width_metal1_conection"]
-    min_distance_between_m1 = params["min_distance_between_m1"]
+    metal_s = params.metal_s
+    width_metal1_conection = params.width_metal1_conection
+    min_distance_between_m1 = params.min_distance_between_m1
 
     firstM1_drain = 0.425
 
@@ -169,16 +127,8 @@ def _add_drain(transistor, params):
         # Add one horizontal drain
         ##########################
 
-        _nf = nf - 1 if nf % 2 == 0 else nf
-
         drainMOS_H = transistor << gf.components.rectangle(
-            size=(
-                (inter_sd_l - 0.07)
-                + (_nf - 1) * inter_sd_l
-                + (_nf - 1) * l_gate
-                - 0.07,
-                width_metal1_conection,
-            ),
+            size=(params.drain_h_length, width_metal1_conection),
             layer=metal_s,
         )  # 3.72
         drainMOS_H.movex(firstM1_drain)
@@ -191,17 +141,10 @@ def _add_drain(transistor, params):
         drainMOS_m1_y = gf.components.rectangle(
             size=(0.38, min_distance_between_m1), layer=metal_s
         )  # agregando el bulk del lado izquierdo
-        vertical_drains_total = (nf + 1) // 2
 
-        for i in range(vertical_drains_total):
+        for drain_dx in params.drain_x:
             drain = transistor << drainMOS_m1_y
-
-            drain.move(
-                [
-                    0.075 + 0.07 + l_gate + (2 * inter_sd_l + 2 * l_gate) * i,
-                    w_gate_folding - 0.06,
-                ]
-            )
+            drain.move([drain_dx, w_gate_folding - 0.06])
 
     else:
         # Add one vertical drain
@@ -214,30 +157,22 @@ def _add_drain(transistor, params):
 
 
 def _add_poly_connect(transistor, params):
-    nf = params["nf"]
-    w_gate_folding = params["w_gate"]
-
     # poly conect
     poly_down = transistor << gf.components.rectangle(
-        size=((nf - 1) * 0.42 + nf * 0.38, 0.38), layer="poly2"
+        size=(params.poly_length, 0.38), layer="poly2"
     )
     poly_down.movex(0.025)
-    poly_down.movey(0.22 + w_gate_folding)
+    poly_down.movey(0.22 + params.w_gate_folding)
 
 
 def _add_bulk(transistor, params):
-    nf = params["nf"]
-    l_gate = params["l_gate"]
-    w_gate_folding = params["w_gate"]
-    inter_sd_l = params["inter_sd_l"]
+    w_gate_folding = params.w_gate_folding
+    bulk_right_x = params.bulk_right_x
 
-    metal_s = params["metal_s"]
-    width_metal1_conection = params["width_metal1_conection"]
-    DistanceFisrt_metal1_conection = params["DistanceFisrt_metal1_conection"]
-    min_distance_between_m1 = params["min_distance_between_m1"]
-
-    bulk_plus = params["bulk_plus"]
-    typeTransistor = params["typeTransistor"]
+    metal_s = params.metal_s
+    width_metal1_conection = params.width_metal1_conection
+    DistanceFisrt_metal1_conection = params.DistanceFisrt_metal1_conection
+    min_distance_between_m1 = params.min_distance_between_m1
 
     # COMP
     ######
@@ -248,7 +183,7 @@ def _add_bulk(transistor, params):
     bulk_comp_left.movex(-3 * (0.36 + 0.01))
 
     bulk_comp_right = transistor << bulk_comp
-    bulk_comp_right.movex(nf * (l_gate + inter_sd_l) + 0.37)
+    bulk_comp_right.movex(bulk_right_x + 0.37)
 
     # METAL1
     ########
@@ -262,7 +197,7 @@ def _add_bulk(transistor, params):
     bulk_m1_left.movey(0.08)
 
     bulk_m1_right = transistor << bulk_m1
-    bulk_m1_right.movex(nf * (l_gate + inter_sd_l) + 0.37)
+    bulk_m1_right.movex(bulk_right_x + 0.37)
     bulk_m1_right.movey(0.08)
 
     # PLUS
@@ -270,7 +205,7 @@ def _add_bulk(transistor, params):
 
     # agregando el bulk del lado derecho   0.87-0.28=0.59
     bulk_plus = gf.components.rectangle(
-        size=(0.59 + 0.27, w_gate_folding + 2 * 0.23), layer=bulk_plus
+        size=(0.59 + 0.27, w_gate_folding + 2 * 0.23), layer=params.bulk_plus
     )
 
     bulk_plus_left = transistor << bulk_plus
@@ -278,13 +213,13 @@ def _add_bulk(transistor, params):
     bulk_plus_left.movey(-0.23)
 
     bulk_plus_right = transistor << bulk_plus
-    bulk_plus_right.movex(nf * (l_gate + inter_sd_l) + 0.16)
+    bulk_plus_right.movex(bulk_right_x + 0.16)
     bulk_plus_right.movey(-0.23)
 
     # NWELL
     #######
 
-    if typeTransistor == "Pmos":
+    if params.typeTransistor == "Pmos":
         bulk_nwell = gf.components.rectangle(
             size=(0.59 + 0.27, w_gate_folding + 2 * 0.43), layer="nwell"
         )
@@ -294,7 +229,7 @@ def _add_bulk(transistor, params):
         bulk_nwell_left.movey(-0.43)
 
         bulk_nwell_right = transistor << bulk_nwell
-        bulk_nwell_right.movex(nf * (l_gate + inter_sd_l) + 0.43)
+        bulk_nwell_right.movex(bulk_right_x + 0.43)
         bulk_nwell_right.movey(-0.43)
 
     # CONNECTION BULK SOURCE
@@ -310,27 +245,11 @@ def _add_bulk(transistor, params):
     )
 
     bulk_m1_right = transistor << bulk_m1_template1
-    bulk_m1_right.move(
-        [
-            DistanceFisrt_metal1_conection
-            + nf * l_gate
-            + nf * inter_sd_l
-            + width_metal1_conection
-            + 0.365,
-            -min_distance_between_m1 + 0.06,
-        ]
-    )
+    bulk_m1_right.move([params.bulk_m1_right_x, -min_distance_between_m1 + 0.06])
 
     # CONNECT
     #########
 
-    # el lado derecho tiene 2 opciones dependiendo de si es par o impar
-    m1_bulk_horizontal_length = 0.36 + 0.365
-    _nf = nf
-    if nf % 2 != 0:
-        m1_bulk_horizontal_length += 0.07 * 2 + width_metal1_conection + l_gate
-        _nf = nf - 1
-
     bulk_m1_left_conect = transistor << gf.components.rectangle(
         size=(0.375 + 0.36, 0.38), layer=metal_s
     )
@@ -342,40 +261,26 @@ def _add_bulk(transistor, params):
     )
 
     bulk_m1_right_conect = transistor << gf.components.rectangle(
-        size=(m1_bulk_horizontal_length, width_metal1_conection),
+        size=(params.bulk_conect_length, width_metal1_conection),
         layer=metal_s,
     )
     bulk_m1_right_conect.move(
         [
-            DistanceFisrt_metal1_conection
-            + _nf * l_gate
-            + _nf * inter_sd_l
-            + width_metal1_conection,
+            params.bulk_conect_x,
             -min_distance_between_m1 + 0.06 - width_metal1_conection,
         ]
     )
 
 
 def _add_bulk_contacts(transistor, params):
-    w_gate_folding = params["w_gate"]
-    nf = params["nf"]
-    l_gate = params["l_gate"]
-    inter_sd_l = params["inter_sd_l"]
-    numberContact = int(w_gate_folding / (0.22 + 0.28))
-
-    # TODO: rewrite comment
-    # cantidadda de contactos en la difusion viene dados por W_gate / (0.22 + 0.28)-> 0.22 ancho de contacto y 0.28 ceparacion entre contactos
     bulk_contact = gf.components.rectangle(size=(0.22, 0.22), layer="contact")
 
-    for i in range(numberContact):
+    for ref1_dy in params.contact_y:
         ref1 = transistor << bulk_contact
         ref2 = transistor << bulk_contact
 
         ref1_dx = -1 * (0.72 + 0.085 + 0.22 + 0.01)
-        ref1_dy = 0.28 * i + 0.22 * i + 0.14
-
-        ref2_dx = nf * (l_gate + inter_sd_l) + 0.445
-        ref2_dy = ref1_dy
+        ref2_dx = params.bulk_right_x + 0.445
 
         ref1.move([ref1_dx, ref1_dy])
-        ref2.move([ref2_dx, ref2_dy])
+        ref2.move([ref2_dx, ref1_dy])
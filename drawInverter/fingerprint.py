@@ -0,0 +1,9 @@
+from layoutDigest import layoutDigest
+
+from .checkConnectivity import componentLayout
+
+
+def layoutFingerprint(component, cell_name: str = None) -> str:
+    # geometry hash of a gdsfactory component or klayout layout, see layoutDigest
+
+    return layoutDigest(componentLayout(component), cell_name)
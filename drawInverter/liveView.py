@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from .fingerprint import layoutFingerprint
+
+# klive plugin of klayout
+KLIVE_HOST = "localhost"
+KLIVE_PORT = 8082
+
+logger = logging.getLogger(__name__)
+
+
+def watchParams(
+    params_file: str,
+    builder,
+    gds_file: str = None,
+    host: str = KLIVE_HOST,
+    port: int = KLIVE_PORT,
+    interval: float = 0.3,
+    max_updates: int = None,
+) -> int:
+    # params_file: json dict of builder keyword parameters, edited by hand
+    # every change is rebuilt through the gf.cell cache, and the viewer only
+    # reloads when the drawn geometry actually changed
+
+    gds_file = gds_file or os.path.splitext(params_file)[0] + ".gds"
+
+    fingerprints = {}
+    shown = None
+    mtime = None
+    updates = 0
+
+    while max_updates is None or updates < max_updates:
+        try:
+            current = os.stat(params_file).st_mtime_ns
+        except OSError:
+            # not created yet, or replaced by the editor while saving
+            time.sleep(interval)
+            continue
+
+        if current == mtime:
+            time.sleep(interval)
+            continue
+
+        mtime = current
+
+        try:
+            with open(params_file) as f:
+                params = json.load(f)
+
+            # unchanged parameters give back the cached cell
+            component = builder(**params)
+
+        except Exception as e:
+            # half saved or invalid parameters, wait for the next edit
+            logger.warning("%s: %s: %s", params_file, type(e).__name__, e)
+            continue
+
+        if component.name not in fingerprints:
+            fingerprints[component.name] = layoutFingerprint(component)
+
+        fingerprint = fingerprints[component.name]
+        if fingerprint == shown:
+            continue
+
+        _write_gds(component, gds_file)
+        sendToViewer(gds_file, host, port)
+
+        shown = fingerprint
+        updates += 1
+
+    return updates
+
+
+def sendToViewer(
+    gds_file: str, host: str = KLIVE_HOST, port: int = KLIVE_PORT, timeout=0.5
+):
+    # same message gf.show sends to klive, keeping the current view position
+
+    message = {"gds": os.path.abspath(gds_file), "keep_position": True}
+
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as conn:
+            conn.sendall(json.dumps(message).encode())
+            return conn.recv(1024).decode()
+
+    except OSError:
+        logger.warning(
+            "klive is not listening on %s:%s, %s not reloaded", host, port, gds_file
+        )
+        return None
+
+
+class LiveViewServer(socketserver.ThreadingTCPServer):
+    # local stand-in of the klive endpoint, records every message it receives
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = KLIVE_HOST, port: int = 0):
+        super().__init__((host, port), _LiveViewHandler)
+        self.messages = []
+        self.received = threading.Condition()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def waitMessages(self, count: int, timeout: float = 5) -> list:
+        with self.received:
+            self.received.wait_for(lambda: len(self.messages) >= count, timeout)
+            return list(self.messages)
+
+
+class _LiveViewHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        message = json.loads(self.request.recv(65536).decode())
+
+        with self.server.received:
+            self.server.messages.append(message)
+            self.server.received.notify_all()
+
+        self.request.sendall(f"loaded {message['gds']}".encode())
+
+
+def _write_gds(component, gds_file):
+    # klive must never load a half written file
+    tmp_file = f"{gds_file}.tmp.gds"
+    component.write_gds(tmp_file)
+    os.replace(tmp_file, gds_file)
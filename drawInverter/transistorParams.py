@@ -0,0 +1,195 @@
+from functools import lru_cache
+
+
+class TransistorParams:
+    # immutable drawTransistor parameters, every derived dimension is computed
+    # once here and shared by drawTransistor, drawInverter and the probes
+
+    # gf180 fet parameters that don't depend on the transistor size
+    l_gate = 0.28
+    inter_sd_l = 0.52  # largo del canal entre finger
+    sd_con_col = 1  # numero de columnas de contacto en la difusion
+    grw = 0.38
+    volt = "3.3V"
+    bulk = "None"
+    con_bet_fin = 1
+    gate_con_pos = "top"  # alternating   #bottom
+    interdig = 1
+    patt = ""
+    deepnwell = 0
+    pcmpgr = 0
+    label = 0
+    sub_label = ""
+    patt_label = 0
+
+    # metal1 straps
+    metal_s = "metal1"
+    width_metal1_conection = 0.38
+    DistanceFisrt_metal1_conection = -0.375
+    min_distance_between_m1 = 0.26
+
+    __slots__ = (
+        "typeTransistor",
+        "w_gate",
+        "folding",
+        "w_gate_folding",
+        "nf",
+        "finger",
+        "bulk_plus",
+        "source_h_length",
+        "source_x",
+        "drain_h_length",
+        "drain_x",
+        "poly_length",
+        "contact_y",
+        "bulk_right_x",
+        "bulk_m1_right_x",
+        "bulk_conect_length",
+        "bulk_conect_x",
+    )
+
+    def __init__(self, typeTransistor: str = "Nmos", w_gate: float = 2, folding: int = 1):
+        init = object.__setattr__
+
+        l_gate = self.l_gate
+        inter_sd_l = self.inter_sd_l
+        width_m1 = self.width_metal1_conection
+        first_m1 = self.DistanceFisrt_metal1_conection
+
+        # ej. foldding = 2, W = 4, x = 2     donde x es la cantida de finger a usar
+        nf = folding if folding > 1 else 1
+        w_gate_folding = w_gate / folding if folding > 1 else w_gate
+
+        init(self, "typeTransistor", typeTransistor)
+        init(self, "w_gate", w_gate)
+        init(self, "folding", folding)
+        init(self, "w_gate_folding", w_gate_folding)
+        init(self, "nf", nf)
+        init(self, "finger", l_gate + inter_sd_l)
+        init(self, "bulk_plus", "pplus" if typeTransistor == "Nmos" else "nplus")
+
+        # nf par -> sources = nf -1  and drain = nf -2      |   nf impar -> sources = nf -1  and drain = nf -1
+        source_nf = nf if nf % 2 == 0 else nf - 1
+        init(
+            self,
+            "source_h_length",
+            2 * (inter_sd_l - 0.07) + (source_nf - 1) * inter_sd_l + source_nf * l_gate,
+        )
+        init(
+            self,
+            "source_x",
+            tuple(
+                first_m1
+                + (0 if i == 0 else 0.07)
+                + (0.07 if i > 1 else 0) * (i - 1)
+                + i * (width_m1 + 0.07 + inter_sd_l)
+                + 2 * i * l_gate
+                for i in range(2 + (nf - 2) // 2)
+            ),
+        )
+
+        drain_nf = nf - 1 if nf % 2 == 0 else nf
+        init(
+            self,
+            "drain_h_length",
+            (inter_sd_l - 0.07)
+            + (drain_nf - 1) * inter_sd_l
+            + (drain_nf - 1) * l_gate
+            - 0.07,
+        )
+        init(
+            self,
+            "drain_x",
+            tuple(
+                0.075 + 0.07 + l_gate + (2 * inter_sd_l + 2 * l_gate) * i
+                for i in range((nf + 1) // 2)
+            ),
+        )
+
+        init(self, "poly_length", (nf - 1) * 0.42 + nf * 0.38)
+
+        # cantidadda de contactos en la difusion viene dados por W_gate / (0.22 + 0.28)
+        # -> 0.22 ancho de contacto y 0.28 ceparacion entre contactos
+        init(
+            self,
+            "contact_y",
+            tuple(
+                0.28 * i + 0.22 * i + 0.14
+                for i in range(int(w_gate_folding / (0.22 + 0.28)))
+            ),
+        )
+
+        init(self, "bulk_right_x", nf * (l_gate + inter_sd_l))
+        init(
+            self,
+            "bulk_m1_right_x",
+            first_m1 + nf * l_gate + nf * inter_sd_l + width_m1 + 0.365,
+        )
+
+        # el lado derecho tiene 2 opciones dependiendo de si es par o impar
+        bulk_nf = nf if nf % 2 == 0 else nf - 1
+        init(
+            self,
+            "bulk_conect_length",
+            0.36
+            + 0.365
+            + (0.07 * 2 + width_m1 + l_gate if nf % 2 != 0 else 0),
+        )
+        init(
+            self,
+            "bulk_conect_x",
+            first_m1 + bulk_nf * l_gate + bulk_nf * inter_sd_l + width_m1,
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, TransistorParams):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (
+            f"TransistorParams(typeTransistor={self.typeTransistor!r}, "
+            f"w_gate={self.w_gate!r}, folding={self.folding!r})"
+        )
+
+    def _key(self):
+        return (self.typeTransistor, self.w_gate, self.folding)
+
+    def fetParameters(self) -> dict:
+        # keyword arguments of gf180.nfet / gf180.pfet
+        return {
+            "l_gate": self.l_gate,
+            "w_gate": self.w_gate_folding,
+            "sd_con_col": self.sd_con_col,
+            "inter_sd_l": self.inter_sd_l,
+            "nf": self.nf,
+            "grw": self.grw,
+            "volt": self.volt,
+            "bulk": self.bulk,
+            "con_bet_fin": self.con_bet_fin,
+            "gate_con_pos": self.gate_con_pos,
+            "interdig": self.interdig,
+            "patt": self.patt,
+            "deepnwell": self.deepnwell,
+            "pcmpgr": self.pcmpgr,
+            "label": self.label,
+            "sub_label": self.sub_label,
+            "patt_label": self.patt_label,
+        }
+
+
+@lru_cache(maxsize=None)
+def transistorParams(
+    typeTransistor: str = "Nmos", w_gate: float = 2, folding: int = 1
+) -> TransistorParams:
+    # sweeps ask for the same sizes over and over, share one object per size
+    return TransistorParams(typeTransistor, w_gate, folding)
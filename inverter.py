@@ -1,7 +1,22 @@
+import os
+import sys
+import json
+
 import drawInverter
 
-from drawInverter import drawInverter
+from drawInverter import drawInverter, watchParams
+
+params = dict(w_gate_Nmos=10, folding_Nmos=10, w_gate_Pmos=6, folding_Pmos=3)
+
+if "--watch" in sys.argv[1:]:
+    # edit inverter.json and klayout reloads the layout when its geometry changes
+    if not os.path.isfile("inverter.json"):
+        with open("inverter.json", "w") as f:
+            json.dump(params, f, indent=2)
+
+    watchParams("inverter.json", drawInverter)
 
-c = drawInverter(w_gate_Nmos=10, folding_Nmos=10, w_gate_Pmos=6, folding_Pmos=3)
+else:
+    c = drawInverter(**params)
 
-c.show(show_ports=True)
+    c.show(show_ports=True)
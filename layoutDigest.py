@@ -0,0 +1,54 @@
+import hashlib
+
+import klayout.db as kdb
+
+
+def layoutDigest(layout: kdb.Layout, cell_name: str = None) -> str:
+    # canonical geometry hash: per layer merged polygons and labels, flattened,
+    # so it only changes when the drawn geometry changes. klayout only, so the
+    # regression can hash its gds files without gdsfactory
+
+    top = layout.cell(cell_name) if cell_name else layout.top_cell()
+
+    digest = hashlib.sha256(f"dbu {layout.dbu:.6g}\n".encode())
+
+    layers = sorted(
+        layout.layer_indexes(),
+        key=lambda li: (layout.get_info(li).layer, layout.get_info(li).datatype),
+    )
+
+    for li in layers:
+        polygons, labels = _layer_shapes(top, li)
+        if not polygons and not labels:
+            continue
+
+        info = layout.get_info(li)
+        digest.update(f"layer {info.layer}/{info.datatype}\n".encode())
+
+        for item in polygons + labels:
+            digest.update(f"{item}\n".encode())
+
+    return digest.hexdigest()
+
+
+def _layer_shapes(top, li):
+    region = kdb.Region()
+    labels = []
+
+    it = top.begin_shapes_rec(li)
+    while not it.at_end():
+        shape = it.shape()
+
+        if shape.is_text():
+            text = shape.text.transformed(it.trans())
+            labels.append(f"text {text.string} {text.x} {text.y}")
+        elif shape.polygon is not None:
+            region.insert(shape.polygon.transformed(it.trans()))
+
+        it.next()
+
+    region.merge()
+
+    polygons = sorted(f"polygon {polygon}" for polygon in region.each())
+
+    return polygons, sorted(labels)
@@ -21,12 +21,13 @@ Globalfoundries 180u PCells cdl Generator
 
 Usage:
     cdl_gen.py (--help| -h)
-    cdl_gen.py (--device=<device_name>) [--thr=<thr>]
+    cdl_gen.py (--device=<device_name>) [--thr=<thr>] [--hier]
 
 Options:
     --help -h                   Print this help message.
     --device=<device_name>      Select your device name. Allowed devices are (bjt , diode, MIM-A, MIM-B_gfB, MIM-B_gfC , fet, cap_mos, res)
     --thr=<thr>                 The number of threads used in run.
+    --hier                      Write one subcircuit per pattern instance plus a top instantiating them.
 """
 
 import pandas as pd
@@ -35,20 +36,29 @@ import os
 import glob
 
 
-def cdl_gen(df, device_name):
+def cdl_gen(df, device_name, out_file=None, hier=False):
     """
     Generate cdl file from a given dataframe
 
     Args :
         df : dataframe of device data
         device_name : name of device under test
+        out_file : cdl file path, defaults to testcases/<device_name>_pcells.cdl
+        hier : write one subcircuit per pattern and a top instantiating them
     """
 
+    if out_file is None:
+        out_file = f"testcases/{device_name}_pcells.cdl"
+
+    # the top subcircuit is named after the first pattern
+    if df.empty:
+        raise ValueError(f"{device_name}: no patterns to write to the cdl")
+
     # open cdl file for write
-    cdl_f = open(f"testcases/{device_name}_pcells.cdl", "w")
+    cdl_f = open(out_file, "w")
 
     # reading top_cell name
-    top_cell = df["netlist_name"][0]
+    top_cell = df["netlist_name"].iloc[0]
 
     # write header of cdl file
     cdl_f.write(
@@ -70,41 +80,34 @@ def cdl_gen(df, device_name):
 ########################################################################################################################
 ## {device_name} Pcells cdl Generator for Klayout of GF180MCU
 ########################################################################################################################
-
-.SUBCKT {top_cell}
-        """
+"""
     )
 
-    if "fet" in device_name:
+    if hier:
 
-        # reading netlist parameters (name,nets,type,values) for every pattern
+        # one subcircuit per pattern, named like the pattern cell of the layout
         for i, row in df.iterrows():
-            nets = row["netlist_nets"].split("_")
-            dev_name = row["dev_name"].split("_")
-            param = row["netlists_param"].split("_")
-            nl = len(nets)
+            ports = " ".join(pattern_ports(row))
 
-            for j in range(nl):
-                cdl_f.write(
-                    f"""
-    {dev_name[j]} {nets[j]} {device_name} {param[j]}
-                    """
-                )
+            cdl_f.write(f"\n.SUBCKT {pattern_cell_name(device_name, i)} {ports}\n")
+            for line in pattern_devices(row, device_name):
+                cdl_f.write(f"    {line}\n")
+            cdl_f.write(".ENDS\n")
 
-    else :
+        cdl_f.write(f"\n.SUBCKT {top_cell}\n")
 
-        # reading netlist parameters (name,nets,type,values) for every pattern
         for i, row in df.iterrows():
-            nets = row["netlist_nets"]
-            dev_name = row["dev_name"]
-            dev_tb = row["dev_tb"]
-            param = row["netlists_param"]
+            ports = " ".join(pattern_ports(row))
+            cdl_f.write(f"    X{i} {ports} {pattern_cell_name(device_name, i)}\n")
+
+    else:
+
+        cdl_f.write(f"\n.SUBCKT {top_cell}\n")
 
-            cdl_f.write(
-                f"""
-{dev_name} {nets} {dev_tb} {param}
-                """
-            )
+        # reading netlist parameters (name,nets,type,values) for every pattern
+        for i, row in df.iterrows():
+            for line in pattern_devices(row, device_name):
+                cdl_f.write(f"    {line}\n")
 
     # write the end of cdl file
     cdl_f.write(
@@ -113,12 +116,64 @@ def cdl_gen(df, device_name):
     """
     )
 
+    cdl_f.close()
 
-if __name__ == "__main__":
 
-    # arguments
-    arguments = docopt(__doc__, version="PCELLS Gen.: 0.1")
-    device = arguments["--device"]
+def pattern_cell_name(device_name, row):
+    """
+    Name shared by the layout cell and the subcircuit of a pattern in hierarchical mode
+
+    Args :
+        device_name : name of device under test
+        row : index of the pattern in its patterns file
+    """
+    return f"{device_name}_p{row}"
+
+
+def pattern_devices(row, device_name):
+    """
+    Returns the cdl device lines of a pattern
+
+    Args :
+        row : pattern row of the patterns dataframe
+        device_name : name of device under test
+    """
+    if "fet" in device_name:
+        nets = row["netlist_nets"].split("_")
+        dev_name = row["dev_name"].split("_")
+        param = row["netlists_param"].split("_")
+
+        return [
+            f"{dev_name[j]} {nets[j]} {device_name} {param[j]}"
+            for j in range(len(nets))
+        ]
+
+    return [
+        f"{row['dev_name']} {row['netlist_nets']} {row['dev_tb']} "
+        f"{row['netlists_param']}"
+    ]
+
+
+def pattern_ports(row):
+    """
+    Returns the nets of a pattern in order of appearance, without duplicates
+
+    Args :
+        row : pattern row of the patterns dataframe
+    """
+    nets = row["netlist_nets"].replace("_", " ").split()
+
+    return list(dict.fromkeys(nets))
+
+
+def run_cdl_gen(device, hier=False):
+    """
+    Runs cdl generation of all pattern files of a device
+
+    Args :
+        device : category of device under test
+        hier : write one subcircuit per pattern instance under the top
+    """
 
     # read patterns file
     file_path = os.path.abspath(__file__)
@@ -134,7 +189,9 @@ if __name__ == "__main__":
 
         # Create output file
         os.makedirs(f"{patt_file_path}/testcases", exist_ok=True)
-        out_file = os.path.join(file_path, "testcases", f"{device_name}_pcells.cdl")
+        out_file = os.path.join(
+            patt_file_path, "testcases", f"{device_name}_pcells.cdl"
+        )
 
         # read patterns file
         df = pd.read_csv(
@@ -142,4 +199,12 @@ if __name__ == "__main__":
         )
 
         # Calling cdl generation function
-        cdl_gen(df=df, device_name=device_name)
+        cdl_gen(df=df, device_name=device_name, out_file=out_file, hier=hier)
+
+
+if __name__ == "__main__":
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS Gen.: 0.1")
+
+    run_cdl_gen(arguments["--device"], arguments["--hier"])
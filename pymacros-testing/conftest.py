@@ -19,7 +19,15 @@
 
 import os
 import glob
-from subprocess import check_call
+import json
+
+import pytest
+
+from shard import REPORTS_DIR, shard_files
+from tool_runner import ToolRunner
+
+# results of the regression tests run by this shard
+SHARD_RESULTS = []
 
 
 def pytest_addoption(parser):
@@ -32,6 +40,99 @@ def pytest_addoption(parser):
     parser.addoption(
         "--device", action="store", default="fet", help="device under test name"
     )
+    parser.addoption(
+        "--hier",
+        action="store_true",
+        default=False,
+        help="generate one cell and subcircuit per pattern for hierarchical lvs",
+    )
+    parser.addoption(
+        "--smoke",
+        action="store_true",
+        default=False,
+        help="only run the pairwise covering subset of every pattern file",
+    )
+    parser.addoption(
+        "--shard-index",
+        action="store",
+        type=int,
+        default=0,
+        help="index of this regression shard, from 0 to shard count - 1",
+    )
+    parser.addoption(
+        "--shard-count",
+        action="store",
+        type=int,
+        default=1,
+        help="total number of regression shards",
+    )
+    parser.addoption(
+        "--max-jobs",
+        action="store",
+        type=int,
+        default=None,
+        help="max number of external drc/lvs tools running at once (default: cpu count)",
+    )
+    parser.addoption(
+        "--tool-timeout",
+        action="store",
+        type=float,
+        default=3600,
+        help="seconds before an external drc/lvs tool is killed",
+    )
+    parser.addoption(
+        "--no-quick-drc",
+        action="store_true",
+        default=False,
+        help="skip the in-process quick drc screening before the full drc deck",
+    )
+    parser.addoption(
+        "--drc-batch",
+        action="store_true",
+        default=False,
+        help="run the drc deck once per variant on all testcases packed in one gds",
+    )
+    parser.addoption(
+        "--no-fingerprint-skip",
+        action="store_true",
+        default=False,
+        help="rerun drc/lvs even when the testcase geometry was verified clean before",
+    )
+    parser.addoption(
+        "--bench-baseline",
+        action="store",
+        default=os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baseline.json"
+        ),
+        help="stored benchmark baseline to compare against",
+    )
+    parser.addoption(
+        "--bench-threshold",
+        action="store",
+        type=float,
+        default=3.0,
+        help="max allowed ratio between a benchmark metric and its baseline",
+    )
+    parser.addoption(
+        "--bench-save",
+        action="store_true",
+        default=False,
+        help="overwrite the benchmark baseline with the current results",
+    )
+
+
+@pytest.fixture(scope="session")
+def tool_runner(request):
+    """
+    Runner of the external drc/lvs tools, shared by the whole session so the
+    --max-jobs cap holds across tests
+    """
+    runner = ToolRunner(
+        request.config.getoption("--max-jobs"),
+        request.config.getoption("--tool-timeout"),
+    )
+    yield runner
+    runner.close()
 
 
 def pytest_generate_tests(metafunc):
@@ -41,7 +142,15 @@ def pytest_generate_tests(metafunc):
     Args :
         metafunc : pytest built in fixture that read data for test functions
     """
-    if "device_name" in metafunc.fixturenames:
+    # tests parametrizing device_name themselves, like the benchmarks
+    own_params = []
+    for marker in metafunc.definition.iter_markers("parametrize"):
+        argnames = marker.args[0]
+        if isinstance(argnames, str):
+            argnames = argnames.replace(" ", "").split(",")
+        own_params.extend(argnames)
+
+    if "device_name" in metafunc.fixturenames and "device_name" not in own_params:
         dev = metafunc.config.getoption("device")
 
         devices = []
@@ -50,9 +159,80 @@ def pytest_generate_tests(metafunc):
         dir_path = os.path.dirname((os.path.abspath(__file__)))
         list_patt_files = glob.glob(os.path.join(dir_path, "patterns", dev, "*.csv"))
 
+        # keep the pattern files of this shard only
+        shard_count = metafunc.config.getoption("shard_count")
+        if shard_count > 1:
+            shard = set(
+                shard_files(metafunc.config.getoption("shard_index"), shard_count)
+            )
+            list_patt_files = [p for p in list_patt_files if p in shard]
+
         # create devices_name list
         for file_path in list_patt_files:
             devices.append(file_path.split("/")[-1].split("_patt")[0])
 
         # make parametric testing of devices list
         metafunc.parametrize("device_name", devices)
+
+
+def pytest_runtest_logreport(report):
+    """
+    records outcome and duration of every test, failures in setup included
+
+    Args :
+        report : pytest test report of one test phase
+    """
+    # nodeids are relative to the rootdir, which may be the repo root
+    module = os.path.basename(report.nodeid.split("::", 1)[0])
+    if module != "pcell_reg_Pytest.py":
+        return
+
+    if report.when == "call" or report.outcome != "passed":
+        device_name = None
+        if "[" in report.nodeid:
+            device_name = report.nodeid.split("[", 1)[1].rstrip("]")
+
+        SHARD_RESULTS.append(
+            {
+                "nodeid": report.nodeid,
+                "device_name": device_name,
+                "outcome": report.outcome,
+                "duration": report.duration,
+            }
+        )
+
+
+def pytest_sessionfinish(session):
+    """
+    writes the test results of this shard for the merge command
+
+    Args :
+        session : pytest session object
+    """
+    config = session.config
+    if not SHARD_RESULTS:
+        return
+
+    dev = config.getoption("device")
+    shard_index = config.getoption("shard_index")
+    shard_count = config.getoption("shard_count")
+
+    dir_path = os.path.dirname((os.path.abspath(__file__)))
+    report_dir = os.path.join(dir_path, "testcases", REPORTS_DIR)
+    os.makedirs(report_dir, exist_ok=True)
+
+    report_file = os.path.join(
+        report_dir, f"{dev}_shard_{shard_index}_of_{shard_count}.json"
+    )
+
+    with open(report_file, "w") as f:
+        json.dump(
+            {
+                "device": dev,
+                "shard_index": shard_index,
+                "shard_count": shard_count,
+                "results": SHARD_RESULTS,
+            },
+            f,
+            indent=2,
+        )
@@ -0,0 +1,335 @@
+########################################################################################################################
+## Tests of the drawInverter builders
+########################################################################################################################
+
+import json
+import os
+import queue
+import sys
+import threading
+
+import gdsfactory as gf
+import gf180
+import klayout.db as kdb
+import pytest
+
+repo_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_path)
+
+from drawInverter import (  # noqa E402
+    bufferArrayProbes,
+    chainProbes,
+    checkConnectivity,
+    componentLayout,
+    drawBufferArray,
+    drawInverter,
+    drawInverterChain,
+    drawRingOscillator,
+    drawTransistor,
+    inverterProbes,
+    layoutFingerprint,
+    LiveViewServer,
+    watchParams,
+)
+from drawInverter.checkConnectivity import LAYERS  # noqa E402
+from drawInverter.drawInverter import _inverter_straps  # noqa E402
+from drawInverter.transistorParams import transistorParams  # noqa E402
+
+# (w_gate_Nmos, folding_Nmos, w_gate_Pmos, folding_Pmos)
+INVERTER_SIZES = [(2, 1, 2, 1), (4, 2, 6, 3), (10, 5, 10, 5)]
+
+# drawTransistor fingerprints and gf180 fet arguments recorded from the
+# builder before TransistorParams, over a (type, w_gate, folding) sweep
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "fingerprints",
+    "drawTransistor_baseline.json",
+)
+
+with open(BASELINE_FILE) as f:
+    TRANSISTOR_BASELINE = json.load(f)
+
+
+def erase_shapes_at(layout, layer, x, y):
+    """
+    Erases the shapes of a layer touching a point of the top cell
+
+    Args :
+        layout : flat layout to edit
+        layer : name of the layer in LAYERS
+        x : point x in um
+        y : point y in um
+    """
+    shapes = layout.top_cell().shapes(layout.layer(*LAYERS[layer]))
+    point = kdb.DPoint(x, y)
+
+    touching = list(shapes.each_touching(kdb.DBox(point, point)))
+    assert touching, f"no {layer} shape at {x}, {y}"
+
+    for shape in touching:
+        shapes.erase(shape)
+
+
+@pytest.mark.parametrize("sizes", INVERTER_SIZES)
+def test_inverter_connected(sizes):
+    result = checkConnectivity(drawInverter(*sizes), inverterProbes(*sizes))
+
+    assert result["opens"] == []
+    assert result["shorts"] == []
+
+
+@pytest.mark.parametrize("stages", [1, 2, 4])
+def test_chain_connected(stages):
+    result = checkConnectivity(drawInverterChain(stages), chainProbes(stages))
+
+    assert result["opens"] == []
+    assert result["shorts"] == []
+
+
+@pytest.mark.parametrize("stages", [3, 5])
+def test_ring_oscillator_connected(stages):
+    probes = chainProbes(stages, ring=True)
+
+    result = checkConnectivity(drawRingOscillator(stages), probes)
+
+    assert result["opens"] == []
+    assert result["shorts"] == []
+
+
+def test_buffer_array_connected():
+    result = checkConnectivity(drawBufferArray(2, 3), bufferArrayProbes(2, 3))
+
+    # buffers of the array are not connected to each other
+    assert result["opens"] == []
+    assert result["shorts"] == []
+
+
+def test_inverter_broken_input():
+    probes = inverterProbes()
+
+    layout = componentLayout(drawInverter())
+    layout.top_cell().flatten(True)
+
+    # the contact between the metal1 input pin and the poly2 strap
+    _, x, y = probes["in"][-1]
+    erase_shapes_at(layout, "contact", x, y)
+
+    result = checkConnectivity(layout, probes)
+
+    assert "in" in result["opens"]
+    assert "out" not in result["opens"]
+
+
+def layer_regions(component):
+    """
+    Returns the merged region of every layer of a flattened component
+
+    Args :
+        component : gdsfactory component
+    """
+    layout = componentLayout(component)
+    top = layout.top_cell()
+    top.flatten(True)
+
+    return {
+        (layout.get_info(li).layer, layout.get_info(li).datatype): kdb.Region(
+            top.shapes(li)
+        ).merged()
+        for li in layout.layer_indexes()
+    }
+
+
+@pytest.mark.parametrize(
+    "sizes", [("Nmos", 2, 1), ("Nmos", 10, 5), ("Pmos", 4, 3), ("Pmos", 6, 6)]
+)
+def test_merge_shapes(sizes):
+    merged = drawTransistor(*sizes, merge_shapes=True)
+    plain = drawTransistor(*sizes, merge_shapes=False)
+
+    # same geometry on every layer
+    merged_regions = layer_regions(merged)
+    plain_regions = layer_regions(plain)
+
+    assert merged_regions.keys() == plain_regions.keys()
+    for layer, region in merged_regions.items():
+        assert (region ^ plain_regions[layer]).is_empty(), layer
+
+    assert merged.info["polygons_after"] <= merged.info["polygons_before"]
+
+    # the gf180 fet is the only reference left
+    params = transistorParams(*sizes)
+    fet = gf180.nfet if params.typeTransistor == "Nmos" else gf180.pfet
+
+    assert len(merged.references) == 1
+    assert merged.references[0].parent.name == fet(**params.fetParameters()).name
+
+
+def builder_fingerprint(component, fet_name):
+    """
+    Fingerprint of the shapes drawTransistor adds around the gf180 fet
+
+    The fet itself is left out, its geometry depends on the installed gf180.
+
+    Args :
+        component : drawTransistor component
+        fet_name : cell name of its gf180 fet
+    """
+    own = gf.Component()
+
+    for ref in component.references:
+        if ref.parent.name != fet_name:
+            own.add_ref(
+                ref.parent,
+                origin=ref.origin,
+                rotation=ref.rotation,
+                x_reflection=ref.x_reflection,
+            )
+
+    return layoutFingerprint(own)
+
+
+@pytest.mark.parametrize(
+    "record",
+    TRANSISTOR_BASELINE,
+    ids=[
+        f"{r['typeTransistor']}-{r['w_gate']}-{r['folding']}"
+        for r in TRANSISTOR_BASELINE
+    ],
+)
+def test_transistor_matches_baseline(record):
+    sizes = (record["typeTransistor"], record["w_gate"], record["folding"])
+    params = transistorParams(*sizes)
+
+    assert params.fetParameters() == record["fet"]
+
+    fet = gf180.nfet if params.typeTransistor == "Nmos" else gf180.pfet
+    fet_name = fet(**params.fetParameters()).name
+
+    assert (
+        builder_fingerprint(drawTransistor(*sizes), fet_name) == record["fingerprint"]
+    )
+
+
+@pytest.mark.parametrize("w_gate_Nmos", [1, 4, 7.5])
+def test_inverter_unfolded_nmos_width(w_gate_Nmos):
+    inverter = drawInverter(w_gate_Nmos, 1, 2, 1)
+    pull_down, pull_up = inverter.references[:2]
+
+    # the pull up sits above the full width of an unfolded pull down
+    assert pull_down.ymax == pytest.approx(drawTransistor("Nmos", w_gate_Nmos, 1).ymax)
+    assert pull_up.ymin > pull_down.ymax
+
+    # and the input contact over its gate
+    straps = _inverter_straps(
+        transistorParams("Nmos", w_gate_Nmos, 1), transistorParams("Pmos", 2, 1)
+    )
+    assert straps["in_y"] == pytest.approx(w_gate_Nmos + 0.8)
+
+    contact = inverter.references[-1]
+    assert contact.parent.layers == {LAYERS["contact"]}
+    assert contact.ymin == pytest.approx(w_gate_Nmos + 0.88)
+
+
+def test_transistor_params_immutable():
+    params = transistorParams("Nmos", 4, 2)
+
+    with pytest.raises(AttributeError):
+        params.w_gate = 6
+
+    with pytest.raises(AttributeError):
+        params.nf = 3
+
+    with pytest.raises(AttributeError):
+        del params.folding
+
+    # no instance dict to write new attributes to
+    with pytest.raises(AttributeError):
+        params.extra = 1
+
+    assert (params.w_gate, params.nf, params.w_gate_folding) == (4, 2, 2)
+
+    # one shared object per size
+    assert transistorParams("Nmos", 4, 2) is params
+    assert transistorParams("Pmos", 4, 2) != params
+
+
+def test_caller_layout_not_flattened():
+    layout = kdb.Layout()
+    top = layout.create_cell("TOP")
+    child = layout.create_cell("CHILD")
+
+    child.shapes(layout.layer(*LAYERS["metal1"])).insert(kdb.DBox(0, 0, 1, 1))
+    top.insert(kdb.DCellInstArray(child.cell_index(), kdb.DTrans()))
+
+    result = checkConnectivity(layout, {"A": [("metal1", 0.5, 0.5)]})
+
+    assert result["opens"] == []
+    assert top.child_instances() == 1
+    assert layout.cells() == 2
+
+
+@gf.cell
+def tagged_box(width: float = 1, tag: str = "") -> gf.Component:
+    # the tag renames the cell without changing its geometry
+    top = gf.Component()
+    top << gf.components.rectangle(size=(width, 1), layer=LAYERS["metal1"])
+    return top
+
+
+def write_params(params_file, params, mtime):
+    """
+    Writes the watched parameters with an explicit mtime, coarse file system
+    mtimes still see every edit
+
+    Args :
+        params_file : watched json file
+        params : builder parameters
+        mtime : file mtime in s
+    """
+    with open(params_file, "w") as f:
+        json.dump(params, f)
+
+    os.utime(params_file, (mtime, mtime))
+
+
+def test_live_view_reloads_on_geometry_change(tmp_path):
+    params_file = str(tmp_path / "box.json")
+    gds_file = str(tmp_path / "box.gds")
+
+    calls = queue.Queue()
+
+    def builder(**params):
+        component = tagged_box(**params)
+        calls.put(params)
+        return component
+
+    with LiveViewServer() as server:
+        # the params file doesn't exist yet when the watch starts
+        watcher = threading.Thread(
+            target=watchParams,
+            args=(params_file, builder, gds_file),
+            kwargs={"port": server.port, "interval": 0.01, "max_updates": 2},
+            daemon=True,
+        )
+        watcher.start()
+
+        write_params(params_file, {"width": 1}, 1_000_000)
+        assert calls.get(timeout=10) == {"width": 1}
+        assert len(server.waitMessages(1)) == 1
+
+        # new cell name, same geometry: nothing to reload
+        write_params(params_file, {"width": 1, "tag": "a"}, 1_000_001)
+        assert calls.get(timeout=10) == {"width": 1, "tag": "a"}
+
+        write_params(params_file, {"width": 2, "tag": "a"}, 1_000_002)
+        assert calls.get(timeout=10) == {"width": 2, "tag": "a"}
+
+        # the watch stops at its second reload
+        watcher.join(timeout=10)
+        assert not watcher.is_alive()
+
+        messages = server.waitMessages(2)
+
+    assert calls.empty()
+    assert messages == [{"gds": gds_file, "keep_position": True}] * 2
+    assert os.path.isfile(gds_file)
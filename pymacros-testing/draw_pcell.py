@@ -21,19 +21,22 @@ Globalfoundries 180u PCells Generator.
 
 Usage:
     draw_pcell.py (--help| -h)
-    draw_pcell.py (--device=<device_name>)
+    draw_pcell.py (--device=<device_name>) [--log=<mode>] [--hier]
 
 Options:
     --help -h                   Print this help message.
     --device=<device_name>      Select your device name. Allowed devices are (bjt , diode, MIM-A, MIM-B_gfB, MIM-B_gfC , fet, cap_mos, res)
+    --log=<mode>                Logging mode: debug (every pattern), summary (per file counters) or quiet (errors only). [default: summary]
+    --hier                      Keep one cell per pattern instance instead of flattening the top cell.
 """
 
 import os
 import sys
-from docopt import docopt
+from docopt import docopt, DocoptExit
 import logging
 import klayout.db as k
 import pandas as pd
+import numpy as np
 import math
 import glob
 import json
@@ -41,14 +44,35 @@ import json
 pcell_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, pcell_path)
 
-from cells import gf180mcu  # noqa E402
+from cdl_gen import pattern_cell_name  # noqa E402
 
 # DEV_SPACES = dict()
 # DEV_SPACES["fet"] = 450
 DB_PERC = 1000
 
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "summary": logging.INFO,
+    "quiet": logging.WARNING,
+}
 
-def draw_pcell(layout, top, lib, patt_file, device_name, device_space):
+
+def log_level(mode):
+    """
+    Returns the logging level of a --log mode, exits with the usage otherwise
+
+    Args :
+        mode : logging mode given on the command line
+    """
+    if mode not in LOG_LEVELS:
+        raise DocoptExit(
+            f"Unknown --log mode {mode}, allowed modes are {', '.join(LOG_LEVELS)}"
+        )
+
+    return LOG_LEVELS[mode]
+
+
+def draw_pcell(layout, top, lib, patt_file, device_name, device_space, hier=False):
     """
     draws pcell using klayout pymacros
 
@@ -56,71 +80,153 @@ def draw_pcell(layout, top, lib, patt_file, device_name, device_space):
         layout : layout object
         top : layout top cell
         lib : pcells library
-        patt_file : patterns csv file path
+        patt_file : patterns csv file path, or an already read patterns dataframe
         device_name : name of the device under test
         device_space : device instances spacing
+        hier : wrap every pattern in its own cell named after the pattern row
+
+    Returns :
+        list of error records (row, params, error) for patterns that failed
     """
 
     # Read csv file of patterns
-    df = pd.read_csv(patt_file)
+    if isinstance(patt_file, pd.DataFrame):
+        df = patt_file
+    else:
+        df = pd.read_csv(patt_file)
 
     # Count num. of patterns [instances]
     patterns_no = df.shape[0]
-    pcell_row_no = int(math.sqrt(patterns_no))
-
-    # inital value for instances location
-    x_shift = 0
-    y_shift = 0
+    pcell_row_no = max(int(math.sqrt(patterns_no)), 1)
+
+    errors = []
+    log_rows = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+    # Instances location of all patterns, filled column by column
+    device_pitch = int(device_space * DB_PERC)
+    patt_idx = np.arange(patterns_no)
+    patt_col = patt_idx // pcell_row_no
+    x_shifts = patt_col * device_pitch
+    y_shifts = (patt_idx % pcell_row_no) * device_pitch
+
+    # Build pcell params from whole columns
+    if "fet" in device_name:
+        params_df = df.drop(
+            columns=[
+                "pcell_name",
+                "netlist_name",
+                "netlist_nets",
+                "netlists_param",
+                "dev_name",
+            ]
+        )
+
+        params_df["g_lbl"] = params_df["g_lbl"].str.split("_")
+        params_df["sd_lbl"] = params_df["sd_lbl"].str.split("_")
+
+    else:
+
+        params_df = df.drop(columns=["pcell_name"])
+
+    params = params_df.to_dict("records")
+    pcell_names = df["pcell_name"].to_numpy()
+    row_labels = df.index.to_numpy()
+
+    # Create pcell variant for each row, identical params share the same cell
+    pcell_ids = {}
+    variants = np.full(patterns_no, -1, dtype=np.int64)
+
+    for i, (pcell_name, param) in enumerate(zip(pcell_names, params)):
+        try:
+            if log_rows:
+                logging.debug(
+                    "Generating pcell for %s with params : %s", device_name, param
+                )
+            if pcell_name not in pcell_ids:
+                # pcell_id gives the first pcell of the library for unknown names
+                if lib.layout().pcell_declaration(pcell_name) is None:
+                    raise ValueError(f"no pcell {pcell_name} in {lib.name()}")
+                pcell_ids[pcell_name] = lib.layout().pcell_id(pcell_name)
+            variants[i] = layout.add_pcell_variant(lib, pcell_ids[pcell_name], param)
+        except Exception as e:
+            errors.append(
+                {"row": int(row_labels[i]), "params": param, "error": str(e)}
+            )
 
-    # Insert instance for each row
-    for i, row in df.iterrows():
+    if hier:
 
-        # Get isntance location
-        if (i % pcell_row_no) == 0:
-            x_shift = 0 if i == 0 else x_shift + device_space * DB_PERC
+        # One cell per pattern, matching the subcircuits of the hierarchical cdl
+        for i in np.flatnonzero(variants >= 0):
+            patt_cell = layout.create_cell(
+                pattern_cell_name(device_name, row_labels[i])
+            )
+            patt_cell.insert(k.CellInstArray(int(variants[i]), k.Trans()))
+            top.insert(
+                k.CellInstArray(
+                    patt_cell.cell_index(),
+                    k.Trans(int(x_shifts[i]), int(y_shifts[i])),
+                )
+            )
 
-        if (i % pcell_row_no) == 0:
-            y_shift = 0
-        else:
-            y_shift = 0 if i == 0 else y_shift + device_space * DB_PERC
+    else:
+
+        # Insert runs of the same variant within a column as one regular array
+        run_breaks = (
+            np.flatnonzero((np.diff(variants) != 0) | (np.diff(patt_col) != 0)) + 1
+        )
+        run_starts = np.r_[0, run_breaks] if patterns_no else run_breaks
+        run_ends = np.r_[run_breaks, patterns_no]
+
+        for start, end in zip(run_starts, run_ends):
+            if variants[start] < 0:
+                continue
+
+            top.insert(
+                k.CellInstArray(
+                    int(variants[start]),
+                    k.Trans(int(x_shifts[start]), int(y_shifts[start])),
+                    k.Vector(0, device_pitch),
+                    k.Vector(device_pitch, 0),
+                    int(end - start),
+                    1,
+                )
+            )
 
-        pcell_name = row["pcell_name"]
+    logging.info(
+        "%s: generated %d/%d patterns, %d errors",
+        device_name,
+        patterns_no - len(errors),
+        patterns_no,
+        len(errors),
+    )
 
-        if "fet" in device_name:
-            param = row.drop(
-                labels=[
-                    "pcell_name",
-                    "netlist_name",
-                    "netlist_nets",
-                    "netlists_param",
-                    "dev_name",
-                ]
-            ).to_dict()
+    return errors
 
-            param["g_lbl"] = param["g_lbl"].split("_")
-            param["sd_lbl"] = param["sd_lbl"].split("_")
 
-        else:
+def write_error_report(out_file, device_name, errors):
+    """
+    Writes the batched generation errors of a pattern file as a json report
 
-            param = row.drop(labels=["pcell_name"]).to_dict()
+    Args :
+        out_file : report file path
+        device_name : name of the device under test
+        errors : list of error records returned by draw_pcell
+    """
+    with open(out_file, "w") as f:
+        json.dump({"device": device_name, "errors": errors}, f, indent=2, default=str)
 
-        try:
-            logging.info(f"Generating pcell for {device_name} with params : {param}")
-            pcell_id = lib.layout().pcell_id(pcell_name)
-            pc = layout.add_pcell_variant(lib, pcell_id, param)
-            top.insert(k.CellInstArray(pc, k.Trans(x_shift, y_shift)))
-        except Exception as e:
-            logging.error(
-                f"Exception happened: {str(e)} for pattern {device_name} {param}"
-            )
+    logging.error(
+        "%s: %d patterns failed, see %s", device_name, len(errors), out_file
+    )
 
 
-def run_generation(target_device):
+def run_generation(target_device, hier=False):
     """
     Runs generation of the device under test
 
     Args :
         target_device : category of device under test
+        hier : keep one cell per pattern instead of a flat top cell
     """
 
     file_path = os.path.dirname(os.path.abspath(__file__))
@@ -131,7 +237,7 @@ def run_generation(target_device):
     # === Read gf180mcu pcells ===
     lib = k.Library.library_by_name("gf180mcu")
 
-    for p in list_patt_files:
+    for n, p in enumerate(list_patt_files, start=1):
 
         # Get device_name
         device = p.split("/")[-1].split("_patt")[0]
@@ -143,39 +249,75 @@ def run_generation(target_device):
         # Read device setting
         dev_setting = json.load(open(f"{file_path}/patterns/{target_device}.json"))
 
-        # Create new layout
-        layout = k.Layout()
+        logging.info("[%d/%d] Generating %s", n, len(list_patt_files), device)
+
+        generate_gds(lib, p, device, dev_setting["spacing"], out_file, hier)
+
+
+def generate_gds(lib, patt_file, device, device_space, out_file, hier=False):
+    """
+    Draws all patterns of one pattern file into a flat gds file
+
+    Args :
+        lib : pcells library
+        patt_file : patterns csv file path or patterns dataframe
+        device : name of the device under test
+        device_space : device instances spacing
+        out_file : output gds file path
+        hier : keep one flat cell per pattern under the top cell
+
+    Returns :
+        list of error records returned by draw_pcell
+    """
+    err_file = os.path.join(os.path.dirname(out_file), f"{device}_errors.json")
+
+    # Create new layout
+    layout = k.Layout()
 
-        # Create top cell
-        top = layout.create_cell(f"{device}_pcells")
+    # Create top cell
+    top = layout.create_cell(f"{device}_pcells")
 
-        # Call draww_pcell
-        draw_pcell(layout, top, lib, p, device, dev_setting["spacing"])
+    # Call draww_pcell
+    errors = draw_pcell(layout, top, lib, patt_file, device, device_space, hier)
 
-        # Flatten cell
+    # Report the failed patterns once per file
+    if errors:
+        write_error_report(err_file, device, errors)
+    elif os.path.isfile(err_file):
+        os.remove(err_file)
+
+    # Flatten cell
+    if hier:
+        for patt_cell in list(top.each_child_cell()):
+            layout.cell(patt_cell).flatten(True)
+    else:
         top.flatten(1)
 
-        # Save the file
-        options = k.SaveLayoutOptions()
-        options.write_context_info = False
-        layout.write(out_file, options)
+    # Save the file
+    options = k.SaveLayoutOptions()
+    options.write_context_info = False
+    layout.write(out_file, options)
+
+    return errors
 
 
 if __name__ == "__main__":
 
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS Gen.: 0.1")
+    target_device = arguments["--device"]
+
     # logs format
     logging.basicConfig(
-        level=logging.DEBUG,
+        level=log_level(arguments["--log"]),
         format="%(asctime)s | %(levelname)-7s | %(message)s",
         datefmt="%d-%b-%Y %H:%M:%S",
     )
 
-    # arguments
-    arguments = docopt(__doc__, version="PCELLS Gen.: 0.1")
-    target_device = arguments["--device"]
-
     # Instantiate and register the library
+    from cells import gf180mcu
+
     gf180mcu()
 
     # Calling main function
-    run_generation(target_device)
+    run_generation(target_device, arguments["--hier"])
@@ -0,0 +1,320 @@
+########################################################################################################################
+## Tests of the pcells generator, on a stub pcells library
+########################################################################################################################
+
+import json
+import logging
+import math
+import os
+
+import klayout.db as k
+import pandas as pd
+import pytest
+from docopt import DocoptExit
+
+from cdl_gen import pattern_cell_name
+from draw_pcell import DB_PERC, LOG_LEVELS, draw_pcell, generate_gds, log_level
+from pcell_gen import pcell_gen
+from smoke import smoke_rows
+
+STUB_LIB = "stub_pcells"
+
+# spacing of the pattern instances in um
+DEVICE_SPACE = 10
+
+
+class StubBox(k.PCellDeclarationHelper):
+    """
+    Stub pcell, a w x l box with a marker sized by n
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.param("w", self.TypeDouble, "Width", default=1.0)
+        self.param("l", self.TypeDouble, "Length", default=1.0)
+        self.param("n", self.TypeInt, "Marker", default=1)
+
+    def display_text_impl(self):
+        return f"stub_box(w={self.w}, l={self.l}, n={self.n})"
+
+    def produce_impl(self):
+        self.cell.shapes(self.layout.layer(34, 0)).insert(k.DBox(0, 0, self.w, self.l))
+        self.cell.shapes(self.layout.layer(36, 0)).insert(
+            k.DBox(-0.5, -0.5, -0.5 + 0.1 * self.n, 0)
+        )
+
+
+class StubLibrary(k.Library):
+    """
+    Library of the stub pcell
+    """
+
+    def __init__(self):
+        self.description = "Stub pcells for the generator tests"
+        self.layout().register_pcell("stub_box", StubBox())
+        self.register(STUB_LIB)
+
+
+@pytest.fixture(scope="session")
+def lib():
+    """
+    Stub pcells library, registered once for the session
+    """
+    StubLibrary()
+    return k.Library.library_by_name(STUB_LIB)
+
+
+def patterns(rows, failing=()):
+    """
+    Returns a patterns dataframe of the stub pcell
+
+    Consecutive rows repeat their parameters in short runs, so runs of the
+    same variant are drawn as arrays.
+
+    Args :
+        rows : number of patterns
+        failing : row indexes drawn with a pcell missing from the library
+    """
+    return pd.DataFrame(
+        {
+            "pcell_name": [
+                "missing_pcell" if i in failing else "stub_box" for i in range(rows)
+            ],
+            "w": [1.0 + (i // 3) % 4 for i in range(rows)],
+            "l": [2.0 + (i // 5) % 2 for i in range(rows)],
+            "n": [1 + (i // 7) % 3 for i in range(rows)],
+        }
+    )
+
+
+def test_error_report(lib, tmp_path):
+    out_file = str(tmp_path / "stub_pcells.gds")
+    err_file = tmp_path / "stub_errors.json"
+
+    errors = generate_gds(lib, patterns(6, failing={2}), "stub", DEVICE_SPACE, out_file)
+
+    assert [e["row"] for e in errors] == [2]
+
+    with open(err_file) as f:
+        report = json.load(f)
+
+    assert report["device"] == "stub"
+    assert len(report["errors"]) == 1
+
+    error = report["errors"][0]
+    assert error["row"] == 2
+    assert error["params"] == {"w": 1.0, "l": 2.0, "n": 1}
+    assert "missing_pcell" in error["error"]
+
+    # a clean rerun removes the stale report
+    assert generate_gds(lib, patterns(6), "stub", DEVICE_SPACE, out_file) == []
+    assert not err_file.exists()
+
+
+def test_failed_rows_keep_their_labels(lib):
+    df = patterns(8, failing={1, 6}).iloc[[0, 1, 4, 6, 7]]
+
+    layout = k.Layout()
+    top = layout.create_cell("stub_pcells")
+
+    errors = draw_pcell(layout, top, lib, df, "stub", DEVICE_SPACE)
+
+    # rows are reported by their label in the patterns file
+    assert [e["row"] for e in errors] == [1, 6]
+
+
+def test_log_level():
+    assert log_level("debug") == logging.DEBUG
+    assert log_level("summary") == logging.INFO
+    assert log_level("quiet") == logging.WARNING
+    assert set(LOG_LEVELS) == {"debug", "summary", "quiet"}
+
+    with pytest.raises(DocoptExit, match="Unknown --log mode verbose"):
+        log_level("verbose")
+
+
+@pytest.mark.parametrize(
+    "mode, per_row, summary", [("debug", 4, 1), ("summary", 0, 1), ("quiet", 0, 0)]
+)
+def test_log_modes(lib, tmp_path, caplog, mode, per_row, summary):
+    caplog.set_level(log_level(mode))
+
+    out_file = str(tmp_path / "stub_pcells.gds")
+    generate_gds(lib, patterns(4), "stub", DEVICE_SPACE, out_file)
+
+    messages = [r.getMessage() for r in caplog.records]
+
+    assert sum(m.startswith("Generating pcell for stub") for m in messages) == per_row
+    assert messages.count("stub: generated 4/4 patterns, 0 errors") == summary
+
+
+def test_quiet_mode_reports_errors(lib, tmp_path, caplog):
+    caplog.set_level(log_level("quiet"))
+
+    out_file = str(tmp_path / "stub_pcells.gds")
+    generate_gds(lib, patterns(4, failing={0}), "stub", DEVICE_SPACE, out_file)
+
+    errors = [r for r in caplog.records if r.levelno == logging.ERROR]
+
+    assert len(errors) == 1
+    assert errors[0].getMessage() == (
+        f"stub: 1 patterns failed, see {os.path.join(tmp_path, 'stub_errors.json')}"
+    )
+
+
+def baseline_draw(layout, top, lib, df, device_space):
+    """
+    Places every pattern with its own instance, like the original row by row
+    draw_pcell did
+
+    Args :
+        layout : layout object
+        top : layout top cell
+        lib : pcells library
+        df : patterns dataframe
+        device_space : device instances spacing
+    """
+    pcell_row_no = max(int(math.sqrt(df.shape[0])), 1)
+    pitch = device_space * DB_PERC
+
+    for i, row in df.reset_index(drop=True).iterrows():
+        x_shift = (i // pcell_row_no) * pitch
+        y_shift = (i % pcell_row_no) * pitch
+
+        # older klayout returned no pcell id for unknown names, and the row failed
+        if lib.layout().pcell_declaration(row["pcell_name"]) is None:
+            continue
+
+        pcell_id = lib.layout().pcell_id(row["pcell_name"])
+        pc = layout.add_pcell_variant(lib, pcell_id, row.drop("pcell_name").to_dict())
+        top.insert(k.CellInstArray(pc, k.Trans(x_shift, y_shift)))
+
+
+def flat_shapes(layout, top):
+    """
+    Returns the sorted polygons of every layer of the flattened top cell,
+    unmerged so an instance drawn twice is seen
+
+    Args :
+        layout : layout object
+        top : layout top cell
+    """
+    return {
+        str(layout.get_info(li)): sorted(
+            str(polygon) for polygon in k.Region(top.begin_shapes_rec(li)).each()
+        )
+        for li in layout.layer_indexes()
+    }
+
+
+@pytest.mark.parametrize("rows", [1, 2, 5, 17, 100])
+def test_placement_matches_baseline(lib, rows):
+    failing = {rows // 2} if rows > 1 else set()
+    df = patterns(rows, failing)
+
+    layout = k.Layout()
+    top = layout.create_cell("stub_pcells")
+    draw_pcell(layout, top, lib, df, "stub", DEVICE_SPACE)
+
+    ref_layout = k.Layout()
+    ref_top = ref_layout.create_cell("stub_pcells")
+    baseline_draw(ref_layout, ref_top, lib, df, DEVICE_SPACE)
+
+    # runs of the same variant in a column are arrays, never more instances
+    assert top.child_instances() <= ref_top.child_instances()
+    if rows >= 17:
+        assert top.child_instances() < ref_top.child_instances()
+
+    top.flatten(True)
+    ref_top.flatten(True)
+
+    shapes = flat_shapes(layout, top)
+
+    assert shapes == flat_shapes(ref_layout, ref_top)
+    assert all(len(polygons) == rows - len(failing) for polygons in shapes.values())
+
+
+def netlist_patterns(rows, failing=()):
+    """
+    Returns a patterns dataframe of the stub pcell with its netlist columns
+
+    Args :
+        rows : number of patterns
+        failing : row indexes drawn with a pcell missing from the library
+    """
+    df = patterns(rows, failing)
+
+    df["netlist_name"] = "stub_pcells"
+    df["netlist_nets"] = [f"plus{i} minus{i}" for i in range(rows)]
+    df["dev_name"] = [f"R{i}" for i in range(rows)]
+    df["dev_tb"] = "stub"
+    df["netlists_param"] = [f"w={w}u l={l}u" for w, l in zip(df["w"], df["l"])]
+
+    return df
+
+
+def read_subckts(cdl_file):
+    """
+    Returns the subcircuit names and the instance lines of a cdl file
+
+    Args :
+        cdl_file : cdl file path
+    """
+    with open(cdl_file) as f:
+        lines = [line.strip() for line in f]
+
+    subckts = [line.split()[1] for line in lines if line.startswith(".SUBCKT")]
+    instances = [line for line in lines if line.startswith("X")]
+
+    return subckts, instances
+
+
+@pytest.mark.parametrize("smoke", [False, True])
+def test_hier_cells_match_subckts(lib, tmp_path, smoke):
+    df = netlist_patterns(30)
+
+    # smoke rows only depend on the pcell parameters, so a failing row can be
+    # picked among the ones it keeps
+    labels = list(smoke_rows(df).index) if smoke else list(df.index)
+    failed = labels[len(labels) // 2]
+    df.loc[failed, "pcell_name"] = "missing_pcell"
+
+    if smoke:
+        assert len(labels) < len(df)
+
+    patt_file = tmp_path / "stub_patterns.csv"
+    df.to_csv(patt_file, index=False)
+
+    gds_file = str(tmp_path / "stub_pcells.gds")
+    cdl_file = str(tmp_path / "stub_pcells.cdl")
+
+    errors = pcell_gen(
+        lib, patt_file, "stub", DEVICE_SPACE, gds_file, cdl_file, True, smoke
+    )
+
+    assert [e["row"] for e in errors] == [failed]
+
+    layout = k.Layout()
+    layout.read(gds_file)
+
+    # a single top with one flat cell per drawn pattern
+    tops = list(layout.each_top_cell())
+    assert len(tops) == 1
+    top = layout.cell(tops[0])
+    assert top.name == "stub_pcells"
+
+    patt_cells = [layout.cell(c).name for c in top.each_child_cell()]
+    assert all(layout.cell(c).child_cells() == 0 for c in top.each_child_cell())
+
+    subckts, instances = read_subckts(cdl_file)
+
+    # the failed pattern keeps its subcircuit, only its layout cell is missing
+    names = [pattern_cell_name("stub", i) for i in labels]
+    assert subckts == names + ["stub_pcells"]
+    assert sorted(patt_cells) == sorted(
+        set(names) - {pattern_cell_name("stub", failed)}
+    )
+
+    assert instances == [
+        f"X{i} plus{i} minus{i} {pattern_cell_name('stub', i)}" for i in labels
+    ]
@@ -0,0 +1,227 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## Batched DRC of many small testcases
+########################################################################################################################
+
+"""
+Globalfoundries 180u PCells batched DRC.
+
+Packs the testcases of several pattern files as tiles of one gds, so the
+DRC deck starts and derives its layers once for all of them, then splits
+the violations of the deck back to the testcase of the tile they fall in.
+
+Usage:
+    drc_batch.py (--help| -h)
+    drc_batch.py pack (--out=<gds_file>) <gds_file>...
+    drc_batch.py split (--tiles=<tiles_file>) <lyrdb_file>...
+
+Options:
+    --help -h                   Print this help message.
+    --out=<gds_file>            Output batch gds file, its tiles are written next to it as json.
+    --tiles=<tiles_file>        Tiles json file written by pack.
+    <gds_file>                  Testcase gds files to pack.
+    <lyrdb_file>                DRC results of the batch gds.
+"""
+
+import os
+import json
+import klayout.db as k
+import klayout.rdb as rdb
+from docopt import docopt
+
+# Gap between tiles, in um, larger than the reach of any drc rule
+TILE_GAP = 100
+
+BATCH_CELL = "batch_pcells"
+
+
+def testcase_name(gds_file):
+    """
+    Returns the testcase name of a generated gds file
+
+    Args :
+        gds_file : testcase gds file path
+    """
+    return os.path.basename(gds_file).split("_pcells")[0]
+
+
+def pack_testcases(gds_files, out_file, gap=TILE_GAP):
+    """
+    Packs testcase layouts side by side as tiles of one gds
+
+    Every testcase keeps its own top cell, placed under the batch top cell.
+
+    Args :
+        gds_files : list of testcase gds file paths
+        out_file : output batch gds file path
+        gap : space between tiles in um
+
+    Returns :
+        dict of testcase name to its tile box [left, bottom, right, top] in um,
+        None for testcases without any shape, which are left out of the batch
+    """
+    layout = k.Layout()
+    top = None
+
+    tiles = {}
+    x = 0
+
+    for gds_file in gds_files:
+        src = k.Layout()
+        src.read(gds_file)
+
+        # All testcases come from the same generator, share its database unit
+        if top is None:
+            layout.dbu = src.dbu
+            top = layout.create_cell(BATCH_CELL)
+
+        src_top = src.top_cell()
+        tile = layout.create_cell(src_top.name)
+        tile.copy_tree(src_top)
+
+        # Nothing to check, and an unplaced cell would be a second top cell
+        box = tile.dbbox()
+        if box.empty():
+            tile.prune_cell()
+            tiles[testcase_name(gds_file)] = None
+            continue
+
+        # Lower left corner of every tile on the batch row
+        top.insert(
+            k.DCellInstArray(tile.cell_index(), k.DTrans(x - box.left, -box.bottom))
+        )
+
+        tiles[testcase_name(gds_file)] = [x, 0, x + box.width(), box.height()]
+        x += box.width() + gap
+
+    options = k.SaveLayoutOptions()
+    options.write_context_info = False
+    layout.write(out_file, options)
+
+    return tiles
+
+
+def tile_of_cell(cell_name, tiles):
+    """
+    Returns the testcase of a violation reported inside a testcase cell
+
+    Args :
+        cell_name : cell name of the violation
+        tiles : dict of testcase name to tile box
+    """
+    # testcase top cells, or per pattern cells of hierarchical testcases
+    names = [n for n, tile in tiles.items() if tile and cell_name.startswith(f"{n}_")]
+
+    return max(names, key=len) if names else None
+
+
+def tile_of_box(box, tiles):
+    """
+    Returns the testcase whose tile contains the center of a violation
+
+    Args :
+        box : violation bounding box in um
+        tiles : dict of testcase name to tile box
+    """
+    center = box.center()
+
+    for name, tile in tiles.items():
+        if tile is None:
+            continue
+
+        left, bottom, right, top = tile
+        if left <= center.x <= right and bottom <= center.y <= top:
+            return name
+
+    return None
+
+
+def value_bbox(value):
+    """
+    Returns the bounding box of a drc result value, None for non geometric ones
+
+    Args :
+        value : report database item value
+    """
+    if value.is_box():
+        return value.box()
+    if value.is_polygon():
+        return value.polygon().bbox()
+    if value.is_path():
+        return value.path().bbox()
+    if value.is_edge():
+        return value.edge().bbox()
+    if value.is_edge_pair():
+        return value.edge_pair().bbox()
+
+    return None
+
+
+def split_violations(lyrdb_files, tiles):
+    """
+    Counts the violations of batch drc results per testcase and rule
+
+    Args :
+        lyrdb_files : drc result files of the batch gds
+        tiles : dict of testcase name to tile box
+
+    Returns :
+        dict of testcase name to {rule: count}, violations outside of any
+        tile are reported under None
+    """
+    violations = {}
+
+    for lyrdb_file in lyrdb_files:
+        db = rdb.ReportDatabase("")
+        db.load(lyrdb_file)
+
+        for item in db.each_item():
+            rule = db.category_by_id(item.category_id()).name()
+            cell_name = db.cell_by_id(item.cell_id()).name()
+
+            name = tile_of_cell(cell_name, tiles)
+
+            if name is None:
+                for value in item.each_value():
+                    box = value_bbox(value)
+                    if box is not None:
+                        name = tile_of_box(box, tiles)
+                        break
+
+            counts = violations.setdefault(name, {})
+            counts[rule] = counts.get(rule, 0) + 1
+
+    return violations
+
+
+if __name__ == "__main__":
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS DRC batch: 0.1")
+
+    if arguments["pack"]:
+        out_file = arguments["--out"]
+        tiles = pack_testcases(arguments["<gds_file>"], out_file)
+
+        with open(f"{os.path.splitext(out_file)[0]}_tiles.json", "w") as f:
+            json.dump(tiles, f, indent=2)
+
+    else:
+        with open(arguments["--tiles"]) as f:
+            tiles = json.load(f)
+
+        violations = split_violations(arguments["<lyrdb_file>"], tiles)
+        print(json.dumps({str(n): v for n, v in violations.items()}, indent=2))
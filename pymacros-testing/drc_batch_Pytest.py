@@ -0,0 +1,163 @@
+########################################################################################################################
+## Tests of the batched drc packing and violations split
+########################################################################################################################
+
+import klayout.db as k
+import klayout.rdb as rdb
+import pytest
+
+from drc_batch import BATCH_CELL, TILE_GAP, pack_testcases, split_violations
+
+# tiles of two testcases, as returned by pack_testcases
+TILES = {
+    "nplus_s": [0, 0, 10, 10],
+    "nplus_s_dw": [110, 0, 130, 20],
+    "pwell": None,
+}
+
+
+def write_testcase(path, top_name, boxes):
+    """
+    Writes a testcase gds with metal1 boxes in its top cell
+
+    Args :
+        path : gds file path
+        top_name : name of the top cell
+        boxes : list of (left, bottom, right, top) in um
+    """
+    layout = k.Layout()
+    top = layout.create_cell(top_name)
+    layer = layout.layer(34, 0)
+
+    for box in boxes:
+        top.shapes(layer).insert(k.DBox(*box))
+
+    layout.write(str(path))
+    return str(path)
+
+
+def write_results(path, items):
+    """
+    Writes a drc results database
+
+    Args :
+        path : lyrdb file path
+        items : list of (rule, cell name, box) with box (left, bottom, right, top)
+            in um, or None for a violation without geometry
+    """
+    db = rdb.ReportDatabase("drc")
+    db.top_cell_name = BATCH_CELL
+
+    for rule, cell_name, box in items:
+        category = db.category_by_path(rule) or db.create_category(rule)
+        cell = db.cell_by_qname(cell_name) or db.create_cell(cell_name)
+
+        item = db.create_item(cell.rdb_id(), category.rdb_id())
+        if box is not None:
+            item.add_value(k.DBox(*box))
+
+    db.save(str(path))
+    return str(path)
+
+
+def test_pack_testcases(tmp_path):
+    gds_files = [
+        write_testcase(tmp_path / "res_a_pcells.gds", "res_a_pcells", [(5, 5, 15, 8)]),
+        write_testcase(tmp_path / "res_b_pcells.gds", "res_b_pcells", []),
+        write_testcase(
+            tmp_path / "res_c_pcells.gds",
+            "res_c_pcells",
+            [(-2, -1, 0, 3), (0, 0, 4, 1)],
+        ),
+    ]
+
+    out_file = str(tmp_path / "batch.gds")
+    tiles = pack_testcases(gds_files, out_file)
+
+    # empty testcases are recorded, not dropped
+    assert tiles == {
+        "res_a": [0, 0, 10, 3],
+        "res_b": None,
+        "res_c": [10 + TILE_GAP, 0, 16 + TILE_GAP, 4],
+    }
+
+    layout = k.Layout()
+    layout.read(out_file)
+
+    # one batch top cell, the empty testcase cell isn't left as a second top
+    assert [c.name for c in layout.top_cells()] == [BATCH_CELL]
+    assert layout.cell("res_b_pcells") is None
+
+    top = layout.top_cell()
+    tile_boxes = sorted(
+        [round(b, 3) for b in (inst.dbbox().left, inst.dbbox().right)]
+        for inst in top.each_inst()
+    )
+    assert tile_boxes == [[0, 10], [10 + TILE_GAP, 16 + TILE_GAP]]
+
+
+def test_split_by_cell_name(tmp_path):
+    lyrdb = write_results(
+        tmp_path / "batch.lyrdb",
+        [
+            # the cell name wins over a box in another tile
+            ("M1.1", "nplus_s_pcells", (115, 5, 116, 6)),
+            # longest testcase name prefix
+            ("M1.1", "nplus_s_dw_pcells", (1, 1, 2, 2)),
+            # per pattern cell of a hierarchical testcase
+            ("M1.2", "nplus_s_dw_3", None),
+        ],
+    )
+
+    assert split_violations([lyrdb], TILES) == {
+        "nplus_s": {"M1.1": 1},
+        "nplus_s_dw": {"M1.1": 1, "M1.2": 1},
+    }
+
+
+def test_split_by_box(tmp_path):
+    lyrdb = write_results(
+        tmp_path / "batch.lyrdb",
+        [
+            ("M1.1", BATCH_CELL, (1, 1, 3, 3)),
+            ("M1.1", BATCH_CELL, (120, 10, 121, 11)),
+            ("M1.2", BATCH_CELL, (119, 10, 121, 12)),
+            # an empty testcase is never blamed, even by its cell name
+            ("M1.2", "pwell_pcells", (2, 2, 4, 4)),
+        ],
+    )
+
+    assert split_violations([lyrdb], TILES) == {
+        "nplus_s": {"M1.1": 1, "M1.2": 1},
+        "nplus_s_dw": {"M1.1": 1, "M1.2": 1},
+    }
+
+
+@pytest.mark.parametrize(
+    "box",
+    [
+        # in the gap between the tiles
+        (50, 2, 52, 4),
+        # above the tiles
+        (5, 40, 6, 41),
+        # no geometry to place the violation
+        None,
+    ],
+)
+def test_split_outside_tiles(tmp_path, box):
+    lyrdb = write_results(
+        tmp_path / "batch.lyrdb",
+        [("DF.1", BATCH_CELL, box), ("DF.1", "nplus_s_pcells", None)],
+    )
+
+    assert split_violations([lyrdb], TILES) == {
+        None: {"DF.1": 1},
+        "nplus_s": {"DF.1": 1},
+    }
+
+
+def test_split_sums_result_files(tmp_path):
+    first = write_results(tmp_path / "a.lyrdb", [("M1.1", BATCH_CELL, (1, 1, 2, 2))])
+    second = write_results(tmp_path / "b.lyrdb", [("M1.1", BATCH_CELL, (3, 3, 4, 4))])
+
+    assert split_violations([first, second], TILES) == {"nplus_s": {"M1.1": 2}}
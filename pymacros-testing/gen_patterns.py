@@ -0,0 +1,300 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## Synthetic pattern files for stress and scaling tests
+########################################################################################################################
+
+"""
+Globalfoundries 180u PCells synthetic patterns generator.
+
+Every synthetic row starts from a row of the original pattern file, which
+gives a valid combination of the categorical parameters (volt, deepnwell,
+bulk, patt, interdig, nf, ...) and of the matching test bench, then samples
+new sizes uniformly within the min / max of the rows sharing its voltage,
+deep nwell and resistor type, whose design rules bound the sizes. Labels,
+netlist nets, netlist parameters and device names are regenerated for the
+new row index.
+
+Usage:
+    gen_patterns.py (--help| -h)
+    gen_patterns.py (--device=<device_name>) (--rows=<rows>) [--seed=<seed>] [--out=<out_dir>]
+
+Options:
+    --help -h                   Print this help message.
+    --device=<device_name>      Select your device name. Allowed devices are (diodes, mim_caps, mos_caps, nfet_03v3, nfet_05v0, nfet_06v0, pfet_03v3, pfet_05v0, pfet_06v0, res)
+    --rows=<rows>               Number of rows of every synthetic pattern file.
+    --seed=<seed>               Random seed. [default: 0]
+    --out=<out_dir>             Output patterns directory. [default: patterns_synth]
+"""
+
+import os
+import re
+import glob
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+from docopt import docopt
+
+PATTERNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "patterns")
+
+# Sizes sampled within the bounds of their group in every pattern file, in um
+SIZE_COLUMNS = ["l_gate", "w_gate", "ld", "la", "wa", "cw", "lc", "wc", "l_res", "w_res"]
+
+# Size bounds depend on these parameters, sizes are sampled within their groups
+GROUP_COLUMNS = ["volt", "deepnwell", "res_type"]
+
+# Columns holding the row index: pin labels, nets and device names
+INDEX_COLUMNS = ["netlist_nets", "dev_name"]
+
+# sc_diode anode width, not a pcell parameter
+SC_DIODE_WA = 0.62
+
+# MIM capacitance of all options, fF/um^2
+MIM_CAP_DENSITY = 2
+
+
+def index_columns(df):
+    """
+    Returns the columns whose values contain the row index
+
+    Args :
+        df : dataframe of patterns
+    """
+    lbl_columns = [c for c in df.columns if c.endswith("_lbl") and c != "patt_lbl"]
+    return lbl_columns + [c for c in INDEX_COLUMNS if c in df.columns]
+
+
+def reindex_labels(values, templates, rows_idx):
+    """
+    Rewrites the labels of the template rows for new row indexes
+
+    Labels end with the row index (p0, s8_d8_s8, gA2), device names have it
+    before the device letter (M2A_M2B). Every template value is split once
+    around its own row index, the new rows join the pieces with theirs.
+
+    Args :
+        values : column of the original patterns
+        templates : template row of every new row
+        rows_idx : array of new row indexes, as strings
+
+    Returns :
+        array of labels for the new rows
+    """
+    pieces = [
+        re.split(rf"(?<=[A-Za-z]){t}(?=[A-Z_ ]|$)", str(v))
+        for t, v in enumerate(values)
+    ]
+    width = max(len(p) for p in pieces)
+
+    table = np.array([p + [""] * (width - len(p)) for p in pieces], dtype=object)
+    indexed = np.array([[j < len(p) for j in range(1, width)] for p in pieces])
+
+    rows_pieces = table[templates]
+    rows_indexed = indexed[templates]
+
+    labels = rows_pieces[:, 0]
+    for j in range(1, width):
+        labels = labels + np.where(rows_indexed[:, j - 1], rows_idx, "")
+        labels = labels + rows_pieces[:, j]
+
+    return labels
+
+
+def size_bounds(src, column):
+    """
+    Returns the min and max of a size column in the group of every row
+
+    Args :
+        src : dataframe of the original patterns
+        column : size column
+
+    Returns :
+        (low, high) arrays with one value per row of src
+    """
+    keys = [c for c in GROUP_COLUMNS if c in src.columns]
+
+    if not keys:
+        low = np.full(src.shape[0], src[column].min())
+        high = np.full(src.shape[0], src[column].max())
+        return low, high
+
+    groups = src.groupby(keys, dropna=False)[column]
+
+    return groups.transform("min").to_numpy(), groups.transform("max").to_numpy()
+
+
+def fet_params(src, templates, w_gate, l_gate):
+    """
+    Netlist parameters of the devices of fet patterns
+
+    Args :
+        src : dataframe of the original patterns
+        templates : template row of every new row
+        w_gate : array of new w_gate
+        l_gate : array of new l_gate
+    """
+    # fingers of every device, from W = fingers * w_gate of the template
+    fingers = [
+        [round(float(w) / w_t) for w in re.findall(r"W=([0-9.e+-]+)u", param)]
+        for param, w_t in zip(src["netlists_param"], src["w_gate"])
+    ]
+    devices = max(len(f) for f in fingers)
+
+    table = np.array([f + [0] * (devices - len(f)) for f in fingers])
+    rows_fingers = table[templates]
+
+    # total widths are written with the resolution of the sizes
+    l_str = "u L=" + l_gate.astype(str).astype(object) + "u"
+
+    params = "W=" + np.round(w_gate * rows_fingers[:, 0], 2).astype(str).astype(object) + l_str
+    for j in range(1, devices):
+        dev = "_W=" + np.round(w_gate * rows_fingers[:, j], 2).astype(str).astype(object) + l_str
+        params = params + np.where(rows_fingers[:, j] > 0, dev, "")
+
+    return params
+
+
+def netlist_params(df):
+    """
+    Netlist parameters of non fet patterns, from their sizes
+
+    Args :
+        df : dataframe of patterns
+    """
+    if "wa" in df.columns:
+        return (
+            "AREA="
+            + (df["la"] * df["wa"]).astype(str)
+            + " PJ="
+            + (2 * (df["la"] + df["wa"])).astype(str)
+        )
+
+    if "m" in df.columns:
+        return (
+            "m="
+            + df["m"].astype(str)
+            + " AREA="
+            + (df["la"] * SC_DIODE_WA).astype(str)
+            + " PJ="
+            + (2 * (df["la"] + SC_DIODE_WA)).astype(str)
+        )
+
+    if "mim_option" in df.columns:
+        return (
+            "M=1 l="
+            + df["lc"].astype(str)
+            + "u w="
+            + df["wc"].astype(str)
+            + "u c = "
+            + (df["lc"] * df["wc"] * MIM_CAP_DENSITY).astype(str)
+            + "f"
+        )
+
+    if "lc" in df.columns:
+        return "M=1 l=" + df["lc"].astype(str) + "u w=" + df["wc"].astype(str) + "u"
+
+    return "L=" + df["l_res"].astype(str) + "u W=" + df["w_res"].astype(str) + "u"
+
+
+def synth_patterns(src, rows, rng, templates=None, sizes=True):
+    """
+    Samples synthetic pattern rows from an original pattern file
+
+    Args :
+        src : dataframe of the original patterns
+        rows : number of synthetic rows
+        rng : numpy random generator
+        templates : template row of every new row, sampled when None
+        sizes : sample new sizes, else keep the template sizes
+
+    Returns :
+        dataframe of synthetic patterns, with the columns of src
+    """
+    if templates is None:
+        templates = rng.integers(0, src.shape[0], rows)
+
+    df = src.iloc[templates].reset_index(drop=True)
+
+    # New sizes within the bounds of the template group, at the file resolution
+    if sizes:
+        for c in SIZE_COLUMNS:
+            if c in df.columns:
+                low, high = size_bounds(src, c)
+                df[c] = np.round(rng.uniform(low[templates], high[templates]), 2)
+
+    rows_idx = np.arange(rows).astype(str).astype(object)
+
+    if "w_gate" in df.columns:
+        df["netlists_param"] = fet_params(
+            src, templates, df["w_gate"].to_numpy(), df["l_gate"].to_numpy()
+        )
+    else:
+        df["netlists_param"] = netlist_params(df)
+
+    # Labels only depend on the template and the new row index
+    for c in index_columns(df):
+        if src[c].notna().all():
+            df[c] = reindex_labels(src[c], templates, rows_idx)
+
+    return df
+
+
+def gen_patterns(device, rows, seed=0, out_dir="patterns_synth"):
+    """
+    Writes synthetic pattern files of all pattern files of a device
+
+    Args :
+        device : category of device under test
+        rows : number of rows of every synthetic pattern file
+        seed : random seed
+        out_dir : output patterns directory
+    """
+    rng = np.random.default_rng(seed)
+
+    os.makedirs(os.path.join(out_dir, device), exist_ok=True)
+
+    # Same device setting as the original patterns
+    shutil.copy(os.path.join(PATTERNS_DIR, f"{device}.json"), out_dir)
+
+    for p in sorted(glob.glob(os.path.join(PATTERNS_DIR, device, "*.csv"))):
+        src = pd.read_csv(p)
+
+        df = synth_patterns(src, rows, rng)
+
+        out_file = os.path.join(out_dir, device, os.path.basename(p))
+        df.to_csv(out_file, index=False)
+
+        logging.info("%s: %d synthetic patterns", out_file, rows)
+
+
+if __name__ == "__main__":
+
+    # logs format
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS patterns: 0.1")
+
+    gen_patterns(
+        arguments["--device"],
+        int(arguments["--rows"]),
+        int(arguments["--seed"]),
+        arguments["--out"],
+    )
@@ -0,0 +1,98 @@
+########################################################################################################################
+## Tests of the synthetic patterns generator
+########################################################################################################################
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gen_patterns import SIZE_COLUMNS, size_bounds, synth_patterns
+
+PATTERN_FILES = sorted(
+    glob.glob(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "patterns", "*", "*.csv")
+    )
+)
+
+
+@pytest.mark.parametrize(
+    "patt_file", PATTERN_FILES, ids=[os.path.basename(p) for p in PATTERN_FILES]
+)
+def test_templates_reproduce_source(patt_file):
+    src = pd.read_csv(patt_file)
+
+    # every row regenerated from itself, with its own index and sizes
+    df = synth_patterns(
+        src,
+        src.shape[0],
+        np.random.default_rng(0),
+        templates=np.arange(src.shape[0]),
+        sizes=False,
+    )
+
+    with open(patt_file) as f:
+        assert df.to_csv(index=False) == f.read()
+
+
+@pytest.mark.parametrize(
+    "patt_file", PATTERN_FILES, ids=[os.path.basename(p) for p in PATTERN_FILES]
+)
+def test_synthetic_rows_keep_columns(patt_file):
+    src = pd.read_csv(patt_file)
+
+    df = synth_patterns(src, 50, np.random.default_rng(1))
+
+    assert list(df.columns) == list(src.columns)
+    assert df.shape[0] == 50
+
+    # labels follow the new row index
+    if "lbl" in df.columns and "g_lbl" in df.columns:
+        assert df["g_lbl"].str.contains("49").any()
+
+
+def test_sizes_sampled_within_template_group():
+    src = pd.DataFrame(
+        {
+            "volt": ["3.3V", "3.3V", "5/6V", "5/6V"],
+            "l_res": [1.0, 2.0, 5.0, 6.0],
+            "w_res": [0.5, 0.8, 3.0, 4.0],
+        }
+    )
+
+    templates = np.array([0, 1, 2, 3] * 250)
+    df = synth_patterns(src, len(templates), np.random.default_rng(2), templates)
+
+    low_volt = df["volt"] == "3.3V"
+
+    assert df.loc[low_volt, "l_res"].between(1.0, 2.0).all()
+    assert df.loc[~low_volt, "l_res"].between(5.0, 6.0).all()
+    assert df.loc[low_volt, "w_res"].between(0.5, 0.8).all()
+    assert df.loc[~low_volt, "w_res"].between(3.0, 4.0).all()
+
+    # sizes are really resampled, not copied from the templates
+    assert df["l_res"].nunique() > 4
+
+
+def test_size_bounds_without_groups():
+    src = pd.DataFrame({"l_res": [1.0, 3.0, 2.0]})
+
+    low, high = size_bounds(src, "l_res")
+
+    assert list(low) == [1.0, 1.0, 1.0]
+    assert list(high) == [3.0, 3.0, 3.0]
+
+
+@pytest.mark.parametrize(
+    "patt_file", PATTERN_FILES, ids=[os.path.basename(p) for p in PATTERN_FILES]
+)
+def test_shipped_sizes_within_file_bounds(patt_file):
+    src = pd.read_csv(patt_file)
+
+    df = synth_patterns(src, 200, np.random.default_rng(3))
+
+    for c in SIZE_COLUMNS:
+        if c in src.columns:
+            assert df[c].between(src[c].min(), src[c].max()).all()
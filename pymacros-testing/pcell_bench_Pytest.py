@@ -0,0 +1,274 @@
+########################################################################################################################
+## Performance benchmarks for the layout generators
+########################################################################################################################
+
+import json
+import os
+import sys
+import time
+
+import gdsfactory as gf
+import klayout.db as k
+import pandas as pd
+import pytest
+
+repo_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_path)
+
+from drawInverter import drawInverter, drawTransistor  # noqa E402
+
+BENCH_ROUNDS = 3
+
+# Metrics compared against the baseline, raw wall time depends on the machine
+COMPARED_METRICS = ["wall_rel", "refs", "polygons", "bytes"]
+
+# Boxes merged by the calibration workload, a fraction of a second
+CALIBRATION_BOXES = 200
+
+# (w_gate, folding) sweep used for both transistor and inverter builders
+GATE_SWEEP = [(2, 1), (4, 2), (10, 5), (40, 10), (80, 40)]
+
+# (device family, pattern file, number of patterns) sweep for draw_pcell
+PATTERN_SWEEP = [
+    ("res", "nwell", 10),
+    ("res", "nwell", 100),
+    ("res", "nwell", 1000),
+    ("nfet_03v3", "nfet_03v3", 10),
+    ("nfet_03v3", "nfet_03v3", 100),
+    ("nfet_03v3", "nfet_03v3", 400),
+]
+
+
+@pytest.fixture(scope="session")
+def bench_results(request):
+    """
+    Collects benchmark metrics and compares / stores them against the baseline
+    """
+    baseline_file = request.config.getoption("--bench-baseline")
+
+    baseline = {}
+    if os.path.isfile(baseline_file):
+        with open(baseline_file) as f:
+            baseline = json.load(f)
+
+    results = {"baseline": baseline, "current": {}}
+
+    yield results
+
+    if request.config.getoption("--bench-save"):
+        baseline.update(results["current"])
+        os.makedirs(os.path.dirname(baseline_file), exist_ok=True)
+        with open(baseline_file, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope="session")
+def calibration():
+    """
+    Times a fixed klayout workload on this machine
+
+    Wall times are stored relative to it, so baselines recorded on another
+    machine stay comparable.
+    """
+    n = CALIBRATION_BOXES
+    best = float("inf")
+
+    for _ in range(BENCH_ROUNDS):
+        start = time.perf_counter()
+        region = k.Region()
+        for i in range(n):
+            for j in range(n):
+                region.insert(k.Box(i * 100, j * 100, i * 100 + 150, j * 100 + 150))
+        region.merge()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+@pytest.fixture(scope="session")
+def pcell_lib():
+    """
+    Registers the gf180mcu pcells library once for the whole session
+
+    Without the cells library only the draw_pcell cases are skipped.
+    """
+    cells = pytest.importorskip("cells", reason="gf180mcu pcells library not found")
+    cells.gf180mcu()
+
+    return k.Library.library_by_name("gf180mcu")
+
+
+def gds_metrics(gds_file):
+    """
+    Reads back a written gds file and counts its references and polygons
+
+    Args :
+        gds_file : path of the gds file to measure
+    """
+    layout = k.Layout()
+    layout.read(gds_file)
+
+    refs = sum(cell.child_instances() for cell in layout.each_cell())
+
+    polygons = 0
+    for top in layout.top_cells():
+        for li in layout.layer_indexes():
+            polygons += sum(1 for _ in top.begin_shapes_rec(li))
+
+    return {
+        "refs": refs,
+        "polygons": polygons,
+        "bytes": os.path.getsize(gds_file),
+    }
+
+
+def check_regression(request, bench_results, bench_id, metrics):
+    """
+    Records metrics and fails if any of them exceeds the baseline by the threshold
+
+    Args :
+        request : pytest request fixture
+        bench_results : session benchmark results
+        bench_id : unique name of the benchmark case
+        metrics : dict of measured metric values
+    """
+    threshold = request.config.getoption("--bench-threshold")
+    bench_results["current"][bench_id] = metrics
+
+    print(f"{bench_id}: {metrics}")
+
+    if request.config.getoption("--bench-save"):
+        return
+
+    # reported as skipped, nothing to compare against yet
+    reference = bench_results["baseline"].get(bench_id)
+    if reference is None:
+        pytest.skip(f"{bench_id} has no baseline entry, store one with make bench-save")
+
+    regressions = [
+        f"{key} {metrics[key]} vs {reference[key]}"
+        for key in COMPARED_METRICS
+        if reference.get(key) and metrics[key] > threshold * reference[key]
+    ]
+
+    assert not regressions, f"{bench_id} regressed: {', '.join(regressions)}"
+
+
+def time_gf_component(builder, gds_file, **kwargs):
+    """
+    Times a gdsfactory builder with a cold cell cache and writes the last result
+
+    Args :
+        builder : gdsfactory cell function
+        gds_file : output gds file path
+        kwargs : builder arguments
+    """
+    best = float("inf")
+
+    for _ in range(BENCH_ROUNDS):
+        gf.clear_cache()
+        start = time.perf_counter()
+        c = builder(**kwargs)
+        best = min(best, time.perf_counter() - start)
+
+    c.write_gds(gds_file)
+
+    return best
+
+
+@pytest.mark.parametrize("w_gate, folding", GATE_SWEEP)
+@pytest.mark.parametrize("typeTransistor", ["Nmos", "Pmos"])
+def test_bench_draw_transistor(
+    request, bench_results, calibration, tmp_path, typeTransistor, w_gate, folding
+):
+    """
+    benchmark drawTransistor for a w_gate / folding sweep
+    """
+    gds_file = str(tmp_path / "transistor.gds")
+
+    wall = time_gf_component(
+        drawTransistor,
+        gds_file,
+        typeTransistor=typeTransistor,
+        w_gate=w_gate,
+        folding=folding,
+    )
+
+    metrics = {"wall": wall, "wall_rel": wall / calibration, **gds_metrics(gds_file)}
+    bench_id = f"drawTransistor[{typeTransistor}-{w_gate}-{folding}]"
+    check_regression(request, bench_results, bench_id, metrics)
+
+
+@pytest.mark.parametrize("w_gate, folding", GATE_SWEEP)
+def test_bench_draw_inverter(
+    request, bench_results, calibration, tmp_path, w_gate, folding
+):
+    """
+    benchmark drawInverter for a w_gate / folding sweep
+    """
+    gds_file = str(tmp_path / "inverter.gds")
+
+    wall = time_gf_component(
+        drawInverter,
+        gds_file,
+        w_gate_Nmos=w_gate,
+        folding_Nmos=folding,
+        w_gate_Pmos=w_gate,
+        folding_Pmos=folding,
+    )
+
+    metrics = {"wall": wall, "wall_rel": wall / calibration, **gds_metrics(gds_file)}
+    bench_id = f"drawInverter[{w_gate}-{folding}]"
+    check_regression(request, bench_results, bench_id, metrics)
+
+
+@pytest.mark.parametrize("device, device_name, patterns_no", PATTERN_SWEEP)
+def test_bench_draw_pcell(
+    request,
+    bench_results,
+    calibration,
+    pcell_lib,
+    tmp_path,
+    device,
+    device_name,
+    patterns_no,
+):
+    """
+    benchmark draw_pcell for growing pattern counts
+    """
+    import draw_pcell
+
+    file_path = os.path.dirname(os.path.abspath(__file__))
+    patt_dir = os.path.join(file_path, "patterns")
+
+    # Resample the pattern file up to the requested number of patterns
+    df = pd.read_csv(os.path.join(patt_dir, device, f"{device_name}_patterns.csv"))
+    df = df.sample(n=patterns_no, replace=True, random_state=0).reset_index(drop=True)
+
+    patt_file = str(tmp_path / f"{device_name}_patterns.csv")
+    df.to_csv(patt_file, index=False)
+
+    with open(os.path.join(patt_dir, f"{device}.json")) as f:
+        dev_setting = json.load(f)
+
+    best = float("inf")
+
+    for _ in range(BENCH_ROUNDS):
+        layout = k.Layout()
+        top = layout.create_cell(f"{device_name}_pcells")
+
+        start = time.perf_counter()
+        draw_pcell.draw_pcell(
+            layout, top, pcell_lib, patt_file, device_name, dev_setting["spacing"]
+        )
+        top.flatten(1)
+        best = min(best, time.perf_counter() - start)
+
+    gds_file = str(tmp_path / f"{device_name}_pcells.gds")
+    options = k.SaveLayoutOptions()
+    options.write_context_info = False
+    layout.write(gds_file, options)
+
+    metrics = {"wall": best, "wall_rel": best / calibration, **gds_metrics(gds_file)}
+    bench_id = f"draw_pcell[{device_name}-{patterns_no}]"
+    check_regression(request, bench_results, bench_id, metrics)
@@ -0,0 +1,422 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## Warm generation daemon for PCells and layout builds
+########################################################################################################################
+
+"""
+Globalfoundries 180u PCells generation daemon.
+
+`serve` imports klayout, gdsfactory, gf180 and pandas once, registers the
+gf180mcu library and then runs generation jobs received on a Unix socket,
+one at a time, so built cells stay cached between jobs. When a source file
+of the generators changes, they are imported again before the next job.
+Every other command is a thin client that only sends one job and waits for
+its result.
+
+Usage:
+    pcell_daemon.py (--help| -h)
+    pcell_daemon.py serve [--socket=<path>] [--log=<mode>]
+    pcell_daemon.py pcells (--device=<device_name>) [--hier] [--smoke] [--socket=<path>]
+    pcell_daemon.py cdl (--device=<device_name>) [--hier] [--socket=<path>]
+    pcell_daemon.py inverter (--out=<gds_file>) [--param=<key_value>...] [--socket=<path>]
+    pcell_daemon.py transistor (--out=<gds_file>) [--param=<key_value>...] [--socket=<path>]
+    pcell_daemon.py ping [--socket=<path>]
+    pcell_daemon.py stop [--socket=<path>]
+
+Options:
+    --help -h                   Print this help message.
+    --socket=<path>             Unix socket of the daemon, defaults to a per user socket in the temp dir.
+    --log=<mode>                Logging mode: debug (every pattern), summary (per file counters) or quiet (errors only). [default: summary]
+    --device=<device_name>      Select your device name. Allowed devices are (bjt , diode, MIM-A, MIM-B_gfB, MIM-B_gfC , fet, cap_mos, res)
+    --hier                      Write one cell / subcircuit per pattern instance under the top.
+    --smoke                     Only generate the pairwise covering subset of the patterns.
+    --out=<gds_file>            Output gds file path of the layout build.
+    --param=<key_value>         Builder parameter as key=value, like w_gate_Nmos=10. Repeatable.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import tempfile
+import importlib
+import socketserver
+from docopt import docopt
+
+DEFAULT_SOCKET = os.path.join(
+    tempfile.gettempdir(), f"gf180_pcell_daemon_{os.getuid()}.sock"
+)
+
+# Generators, drawInverter and the cells library all live in the repo root
+CODE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Jobs with the generators they run, filled by serve
+JOBS = {}
+
+
+def job_pcells(device, hier=False, smoke=False):
+    """
+    Generates gds and cdl of all pattern files of a device
+
+    Args :
+        device : category of device under test
+        hier : write matching per pattern cells and subcircuits
+        smoke : only use the pairwise covering subset of the patterns
+    """
+    from pcell_gen import run_generation
+
+    run_generation(device, hier=hier, smoke=smoke)
+
+
+def job_cdl(device, hier=False):
+    """
+    Generates the cdl of all pattern files of a device
+
+    Args :
+        device : category of device under test
+        hier : write one subcircuit per pattern instance under the top
+    """
+    from cdl_gen import run_cdl_gen
+
+    run_cdl_gen(device, hier)
+
+
+def job_layout(builder, out, params):
+    """
+    Builds a drawInverter cell and writes it, cached cells are reused
+
+    Args :
+        builder : drawInverter builder name, like drawInverter
+        out : output gds file path
+        params : builder keyword parameters
+    """
+    import drawInverter
+
+    component = getattr(drawInverter, builder)(**params)
+    component.write_gds(out)
+
+    return {"cell": component.name, "gds": out}
+
+
+def file_mtime(path):
+    """
+    Returns the mtime of a file in ns, None if it was removed
+
+    Args :
+        path : file path
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def code_files(names, root=CODE_ROOT):
+    """
+    Returns the source file and mtime of the imported modules under root
+
+    Args :
+        names : module names
+        root : directory of the tracked code
+    """
+    files = {}
+
+    for name in names:
+        path = getattr(sys.modules.get(name), "__file__", None)
+        if path and os.path.abspath(path).startswith(os.path.join(root, "")):
+            files[name] = (path, file_mtime(path))
+
+    return files
+
+
+def warm_imports():
+    """
+    Imports the generators and registers the gf180mcu library
+    """
+    import pcell_gen  # noqa F401
+    import drawInverter  # noqa F401
+    from cells import gf180mcu
+
+    gf180mcu()
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """
+    Runs one json job per connection and answers with one json result line
+    """
+
+    def handle(self):
+        start = time.time()
+
+        try:
+            request = json.loads(self.rfile.readline())
+            job = request.pop("job")
+
+            logging.info("Running %s job %s", job, request)
+
+            if job != "stop":
+                self.server.reload_code()
+
+            if job == "ping":
+                result = {
+                    "pid": os.getpid(),
+                    "jobs": self.server.jobs_done,
+                    "reloads": self.server.reloads,
+                    "code_mtime": self.server.code_mtime(),
+                }
+            elif job == "stop":
+                result = None
+                self.server.stopping = True
+            else:
+                result = JOBS[job](**request)
+
+            response = {"ok": True, "result": result}
+
+        except Exception as e:
+            logging.exception("Job failed")
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        # modules imported by the job are reloaded too when they change
+        self.server.track_code()
+
+        response["duration"] = round(time.time() - start, 3)
+        self.server.jobs_done += 1
+
+        self.wfile.write((json.dumps(response, default=str) + "\n").encode())
+
+
+class PcellDaemon(socketserver.UnixStreamServer):
+    """
+    Serial job server, jobs share the cell caches so they never run concurrently
+
+    Modules imported from code_root are tracked, and imported again when one
+    of their files changes.
+    """
+
+    def __init__(self, socket_path, warm=warm_imports, code_root=CODE_ROOT):
+        self.jobs_done = 0
+        self.stopping = False
+
+        self.warm = warm
+        self.code_root = code_root
+        self.code = {}
+        self.reloads = 0
+
+        # imports before binding, a broken generator leaves no stale socket
+        self.warm()
+        self.track_code()
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        super().__init__(socket_path, JobHandler)
+        self.socket_path = socket_path
+
+    def track_code(self):
+        """
+        Records the files of code modules imported since the last call, the
+        daemon itself aside
+        """
+        new = set(sys.modules) - set(self.code) - {"__main__", __name__}
+        self.code.update(code_files(new, self.code_root))
+
+    def code_mtime(self):
+        """
+        Returns the time of the newest tracked source file, None without code
+        """
+        mtimes = [mtime for _, mtime in self.code.values() if mtime is not None]
+        if not mtimes:
+            return None
+
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(max(mtimes) / 1e9))
+
+    def reload_code(self):
+        """
+        Imports the tracked code again when one of its files changed
+
+        All tracked modules are dropped, not only the changed ones, since the
+        others hold references to them. Built cells are cleared as well so they
+        are drawn again by the new code. If the new code fails to import, the
+        reload is tried again on the next job.
+        """
+        changed = sorted(
+            name
+            for name, (path, mtime) in self.code.items()
+            if file_mtime(path) != mtime
+        )
+        if not changed:
+            return
+
+        logging.info("Reloading code, changed modules: %s", ", ".join(changed))
+
+        for name in self.code:
+            sys.modules.pop(name, None)
+
+        if "gdsfactory" in sys.modules:
+            sys.modules["gdsfactory"].clear_cache()
+
+        importlib.invalidate_caches()
+        self.warm()
+
+        self.code = {}
+        self.track_code()
+        self.reloads += 1
+
+    def serve_jobs(self):
+        """
+        Handles jobs one at a time until a stop job
+        """
+        while not self.stopping:
+            self.handle_request()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def serve(socket_path=DEFAULT_SOCKET):
+    """
+    Imports the generators once and serves jobs until a stop job
+
+    Args :
+        socket_path : unix socket path
+    """
+    # drawInverter lives in the repo root
+    file_path = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(file_path))
+
+    JOBS.update(
+        {
+            "pcells": job_pcells,
+            "cdl": job_cdl,
+            "layout": job_layout,
+        }
+    )
+
+    # Warm imports, the library is registered once for all jobs
+    with PcellDaemon(socket_path) as server:
+        logging.info("Serving pcell jobs on %s", socket_path)
+        server.serve_jobs()
+
+    logging.info(
+        "Stopped after %d jobs, %d code reloads", server.jobs_done, server.reloads
+    )
+
+
+def submit(job, socket_path=DEFAULT_SOCKET, **kwargs):
+    """
+    Sends one job to the daemon and waits for its result
+
+    Args :
+        job : job name
+        socket_path : unix socket path
+        kwargs : job parameters
+
+    Returns :
+        response dict with ok, result or error and duration
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+
+        client.sendall((json.dumps({"job": job, **kwargs}) + "\n").encode())
+
+        with client.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+def parse_params(key_values):
+    """
+    Parses key=value builder parameters, values are read as json when possible
+
+    Args :
+        key_values : list of key=value strings
+    """
+    params = {}
+
+    for kv in key_values:
+        key, _, value = kv.partition("=")
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+
+    return params
+
+
+if __name__ == "__main__":
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS daemon: 0.1")
+    socket_path = arguments["--socket"] or DEFAULT_SOCKET
+
+    # logs format
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    if arguments["serve"]:
+        from draw_pcell import log_level
+
+        logging.getLogger().setLevel(log_level(arguments["--log"]))
+        serve(socket_path)
+        sys.exit(0)
+
+    if arguments["pcells"]:
+        job = {
+            "job": "pcells",
+            "device": arguments["--device"],
+            "hier": arguments["--hier"],
+            "smoke": arguments["--smoke"],
+        }
+    elif arguments["cdl"]:
+        job = {
+            "job": "cdl",
+            "device": arguments["--device"],
+            "hier": arguments["--hier"],
+        }
+    elif arguments["inverter"] or arguments["transistor"]:
+        job = {
+            "job": "layout",
+            "builder": "drawInverter" if arguments["inverter"] else "drawTransistor",
+            "out": os.path.abspath(arguments["--out"]),
+            "params": parse_params(arguments["--param"]),
+        }
+    elif arguments["ping"]:
+        job = {"job": "ping"}
+    else:
+        job = {"job": "stop"}
+
+    try:
+        response = submit(socket_path=socket_path, **job)
+    except (FileNotFoundError, ConnectionRefusedError):
+        logging.error(
+            "No pcell daemon on %s, start it with: python3 pcell_daemon.py serve",
+            socket_path,
+        )
+        sys.exit(2)
+
+    if not response["ok"]:
+        logging.error("%s job failed: %s", job["job"], response["error"])
+        sys.exit(1)
+
+    logging.info(
+        "%s job done in %.3fs: %s", job["job"], response["duration"], response["result"]
+    )
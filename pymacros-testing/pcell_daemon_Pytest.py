@@ -0,0 +1,182 @@
+########################################################################################################################
+## Tests of the pcell generation daemon
+########################################################################################################################
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import pytest
+
+import pcell_daemon
+from pcell_daemon import JOBS, PcellDaemon, parse_params, submit
+
+GENERATOR = "VERSION = {version}\n\n\ndef build(size):\n    return [VERSION, size]\n"
+
+
+@pytest.fixture
+def code_dir(monkeypatch):
+    """
+    Short temp dir, unix socket paths are limited to about 100 characters,
+    holding a generator module importable by the daemon
+    """
+    path = tempfile.mkdtemp(prefix="daemon")
+    write_generator(path, 1)
+
+    monkeypatch.syspath_prepend(path)
+    yield path
+
+    sys.modules.pop("fake_generator", None)
+    shutil.rmtree(path)
+
+
+def write_generator(code_dir, version):
+    """
+    Writes the generator module with a new mtime
+
+    Args :
+        code_dir : generator directory
+        version : version returned by the generator
+    """
+    path = os.path.join(code_dir, "fake_generator.py")
+    mtime = os.stat(path).st_mtime_ns + 10**9 if os.path.exists(path) else None
+
+    with open(path, "w") as f:
+        f.write(GENERATOR.format(version=version))
+
+    # file systems with coarse mtimes still see the change
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def job_build(size):
+    return importlib.import_module("fake_generator").build(size)
+
+
+def job_fail():
+    raise RuntimeError("generator failed")
+
+
+@pytest.fixture
+def daemon(code_dir, monkeypatch):
+    """
+    Daemon serving the fake generator jobs in a thread
+    """
+    monkeypatch.setitem(JOBS, "build", job_build)
+    monkeypatch.setitem(JOBS, "fail", job_fail)
+
+    socket_path = os.path.join(code_dir, "daemon.sock")
+
+    server = PcellDaemon(
+        socket_path,
+        warm=lambda: importlib.import_module("fake_generator"),
+        code_root=code_dir,
+    )
+    thread = threading.Thread(target=server.serve_jobs)
+    thread.start()
+
+    yield server
+
+    # set before the stop job answers, the thread may still be running
+    if not server.stopping:
+        submit("stop", socket_path=socket_path)
+    thread.join(timeout=10)
+    server.server_close()
+
+
+def test_parse_params():
+    params = parse_params(
+        ["w_gate_Nmos=10", "folding=2", "w=0.5", "ring=true", "name=inv", "expr=a=b"]
+    )
+
+    assert params == {
+        "w_gate_Nmos": 10,
+        "folding": 2,
+        "w": 0.5,
+        "ring": True,
+        "name": "inv",
+        "expr": "a=b",
+    }
+
+
+def test_parse_params_json_values():
+    assert parse_params(["sizes=[1, 2]", 'label="3"', "empty="]) == {
+        "sizes": [1, 2],
+        "label": "3",
+        "empty": "",
+    }
+
+
+def test_submit_job(daemon):
+    response = submit("build", socket_path=daemon.socket_path, size=3)
+
+    assert response["ok"]
+    assert response["result"] == [1, 3]
+    assert response["duration"] >= 0
+
+
+def test_failed_jobs_keep_serving(daemon):
+    failed = submit("fail", socket_path=daemon.socket_path)
+    unknown = submit("missing", socket_path=daemon.socket_path)
+
+    assert not failed["ok"]
+    assert failed["error"] == "RuntimeError: generator failed"
+    assert not unknown["ok"]
+    assert unknown["error"].startswith("KeyError")
+
+    ping = submit("ping", socket_path=daemon.socket_path)
+
+    assert ping["ok"]
+    assert ping["result"]["pid"] == os.getpid()
+    assert ping["result"]["jobs"] == 2
+
+
+def test_stop_removes_socket(daemon):
+    response = submit("stop", socket_path=daemon.socket_path)
+
+    assert response == {"ok": True, "result": None, "duration": response["duration"]}
+
+    daemon.server_close()
+    assert not os.path.exists(daemon.socket_path)
+
+    with pytest.raises(FileNotFoundError):
+        submit("ping", socket_path=daemon.socket_path)
+
+
+def test_changed_code_is_reloaded(daemon, code_dir):
+    first = submit("ping", socket_path=daemon.socket_path)["result"]
+
+    assert first["reloads"] == 0
+    assert first["code_mtime"] is not None
+    assert submit("build", socket_path=daemon.socket_path, size=1)["result"] == [1, 1]
+
+    write_generator(code_dir, 2)
+
+    assert submit("build", socket_path=daemon.socket_path, size=1)["result"] == [2, 1]
+
+    ping = submit("ping", socket_path=daemon.socket_path)["result"]
+
+    assert ping["reloads"] == 1
+    assert ping["code_mtime"] > first["code_mtime"]
+
+
+def test_broken_code_retried_on_next_job(daemon, code_dir):
+    path = os.path.join(code_dir, "fake_generator.py")
+    mtime = os.stat(path).st_mtime_ns + 10**9
+
+    with open(path, "a") as f:
+        f.write("def broken(:\n")
+    os.utime(path, ns=(mtime, mtime))
+
+    response = submit("build", socket_path=daemon.socket_path, size=1)
+
+    assert not response["ok"]
+    assert response["error"].startswith("SyntaxError")
+
+    write_generator(code_dir, 3)
+
+    assert submit("build", socket_path=daemon.socket_path, size=1)["result"] == [3, 1]
+    assert pcell_daemon.__name__ not in daemon.code
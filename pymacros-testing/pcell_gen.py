@@ -0,0 +1,178 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## Pcells gds and cdl Generator for Klayout of GF180MCU
+########################################################################################################################
+
+"""
+Globalfoundries 180u PCells gds and cdl Generator.
+
+Reads every pattern file once and writes both the layout and its netlist.
+Patterns that fail to draw are still written to the cdl, so lvs of the
+testcase reports them.
+
+Usage:
+    pcell_gen.py (--help| -h)
+    pcell_gen.py (--device=<device_name>) [--log=<mode>] [--hier] [--smoke] [--patterns=<patterns_dir>] [--shard-index=<index> --shard-count=<count>]
+
+Options:
+    --help -h                   Print this help message.
+    --device=<device_name>      Select your device name. Allowed devices are (bjt , diode, MIM-A, MIM-B_gfB, MIM-B_gfC , fet, cap_mos, res)
+    --log=<mode>                Logging mode: debug (every pattern), summary (per file counters) or quiet (errors only). [default: summary]
+    --hier                      Write one cell / subcircuit per pattern instance under the top.
+    --smoke                     Only generate the pairwise covering subset of the patterns.
+    --patterns=<patterns_dir>   Patterns directory, like the synthetic patterns of gen_patterns.py. Defaults to patterns.
+    --shard-index=<index>       Only generate the pattern files of this regression shard.
+    --shard-count=<count>       Total number of regression shards.
+"""
+
+import os
+import glob
+import json
+import logging
+import klayout.db as k
+import pandas as pd
+from docopt import docopt
+
+from draw_pcell import generate_gds, log_level
+from cdl_gen import cdl_gen
+from shard import shard_files
+from smoke import smoke_rows
+
+
+def pcell_gen(
+    lib, patt_file, device, device_space, gds_file, cdl_file, hier=False, smoke=False
+):
+    """
+    Generates gds and cdl of one pattern file from a single read
+
+    Args :
+        lib : pcells library
+        patt_file : patterns csv file path
+        device : name of the device under test
+        device_space : device instances spacing
+        gds_file : output gds file path
+        cdl_file : output cdl file path
+        hier : write matching per pattern cells and subcircuits
+        smoke : only use the pairwise covering subset of the patterns
+    """
+
+    # Read csv file of patterns once for both outputs
+    df = pd.read_csv(patt_file)
+
+    if smoke:
+        df = smoke_rows(df)
+
+    errors = generate_gds(lib, df, device, device_space, gds_file, hier)
+
+    # Patterns that could not be drawn stay in the netlist, so lvs reports them
+    cdl_gen(df=df, device_name=device, out_file=cdl_file, hier=hier)
+
+    if errors:
+        logging.warning(
+            "%s: %d failed patterns kept in the cdl, lvs will not match",
+            device,
+            len(errors),
+        )
+
+    return errors
+
+
+def run_generation(
+    target_device,
+    hier=False,
+    shard_index=0,
+    shard_count=1,
+    smoke=False,
+    patterns_dir=None,
+):
+    """
+    Runs gds and cdl generation of the device under test
+
+    Args :
+        target_device : category of device under test
+        hier : write matching per pattern cells and subcircuits
+        shard_index : index of this regression shard
+        shard_count : total number of regression shards
+        smoke : only use the pairwise covering subset of the patterns
+        patterns_dir : patterns directory, defaults to the original patterns
+    """
+
+    file_path = os.path.dirname(os.path.abspath(__file__))
+    patterns_dir = patterns_dir or os.path.join(file_path, "patterns")
+    list_patt_files = glob.glob(os.path.join(patterns_dir, target_device, "*.csv"))
+
+    # keep the pattern files of this shard only
+    if shard_count > 1:
+        shard = set(shard_files(shard_index, shard_count, patterns_dir=patterns_dir))
+        list_patt_files = [p for p in list_patt_files if p in shard]
+
+    # Read device setting
+    with open(os.path.join(patterns_dir, f"{target_device}.json")) as f:
+        dev_setting = json.load(f)
+
+    # === Read gf180mcu pcells ===
+    lib = k.Library.library_by_name("gf180mcu")
+
+    # Create output dir
+    test_dir = os.path.join(file_path, "testcases")
+    os.makedirs(test_dir, exist_ok=True)
+
+    for n, p in enumerate(list_patt_files, start=1):
+
+        # Get device_name
+        device = p.split("/")[-1].split("_patt")[0]
+
+        logging.info("[%d/%d] Generating %s", n, len(list_patt_files), device)
+
+        pcell_gen(
+            lib,
+            p,
+            device,
+            dev_setting["spacing"],
+            os.path.join(test_dir, f"{device}_pcells.gds"),
+            os.path.join(test_dir, f"{device}_pcells.cdl"),
+            hier,
+            smoke,
+        )
+
+
+if __name__ == "__main__":
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS Gen.: 0.1")
+    target_device = arguments["--device"]
+
+    # logs format
+    logging.basicConfig(
+        level=log_level(arguments["--log"]),
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Instantiate and register the library
+    from cells import gf180mcu
+
+    gf180mcu()
+
+    # Calling main function
+    run_generation(
+        target_device,
+        arguments["--hier"],
+        int(arguments["--shard-index"] or 0),
+        int(arguments["--shard-count"] or 1),
+        arguments["--smoke"],
+        arguments["--patterns"],
+    )
@@ -1,8 +1,15 @@
 import pytest
-from subprocess import check_call
 import os
+import sys
+import glob
+import shutil
+import logging
 import yaml
 
+from drc_batch import pack_testcases, split_violations
+from quick_drc import quick_drc_file
+from verified_cache import is_verified, mark_verified, testcase_fingerprint
+
 
 @pytest.fixture
 def device(request):
@@ -12,154 +19,386 @@ def device(request):
     return request.config.getoption("--device")
 
 
-@pytest.mark.dependency()
-def test_gds_generation(device):
+@pytest.fixture
+def quick_drc(request):
     """
-    generate gds files for device under test
+    Returns whether the quick drc screening runs before the full drc deck
+    """
+    return not request.config.getoption("--no-quick-drc")
 
-    Args:
-        device : name of the device under test
+
+@pytest.fixture
+def fingerprint_skip(request):
+    """
+    Returns whether checks of testcases with verified-clean geometry are skipped
     """
+    return not request.config.getoption("--no-fingerprint-skip")
 
-    # gds generation command string
-    call_str = f"""
-    python3 draw_pcell.py --device={device}
+
+def rule_deck_dir(deck):
     """
+    Returns the directory of a klayout rule deck of the gf180mcu pv repo
 
-    # assert whether generation is passed
-    assert bool(check_call(call_str, shell=True)) == 0
+    Args:
+        deck : rule deck name, drc or lvs
+    """
+    file_path = os.path.dirname(os.path.abspath(__file__))
+    root_path = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.dirname(file_path)))
+    )
 
+    return os.path.join(
+        root_path, "globalfoundries-pdk-libs-gf180mcu_fd_pv/klayout", deck
+    )
 
-@pytest.mark.dependency()
-def test_cdl_generation(device):
+
+def read_variant(patt_dir, device, device_name):
     """
-    generate cdl files for device under test
+    Returns the variant forced by the patterns yaml file, or None if there isn't one
 
     Args:
+        patt_dir : patterns directory path
         device : name of the device under test
+        device_name : name of device testcase to be tested
     """
+    yaml_file = f"{patt_dir}/{device}/{device_name}_patterns.yaml"
 
-    # cdl generation command string
-    call_str = f"""
-    python3 cdl_gen.py --device={device}
-    """
+    if not os.path.isfile(yaml_file):
+        return None
 
-    # assert whether generation is passed
-    assert bool(check_call(call_str, shell=True)) == 0
+    with open(yaml_file) as file:
+        try:
+            var_data = yaml.safe_load(file)
+            return var_data[device_name]["variant"]
+        except yaml.YAMLError as exc:
+            print(exc)
 
 
-@pytest.mark.dependency(depends=["test_gds_generation"])
-def test_drc_run(device, device_name):
+def drc_variants(patt_dir, device, device_name):
     """
-    run drc testing for device under test testcases
+    Returns the variants a testcase is checked with: the forced one, or A, B and C
 
     Args:
+        patt_dir : patterns directory path
         device : name of the device under test
         device_name : name of device testcase to be tested
     """
-    # get drc rule_deck path , testing dir path
+    variant = read_variant(patt_dir, device, device_name)
+    return [variant] if variant else ["A", "B", "C"]
 
-    file_path = os.path.dirname(os.path.abspath(__file__))
-    root_path = os.path.dirname(
-        os.path.dirname(os.path.dirname(os.path.dirname(file_path)))
-    )
 
-    drc_path = "globalfoundries-pdk-libs-gf180mcu_fd_pv/klayout/drc"
-    drc_dir = os.path.join(root_path, drc_path)
+@pytest.fixture(scope="session")
+def drc_batch(request, tool_runner):
+    """
+    Runs the drc deck once per variant on all testcases of the session packed
+    in one gds, when --drc-batch is set
+
+    Testcase variants already verified clean are left out of the batch, and
+    clean results are marked verified, so batched tests neither fingerprint
+    nor screen their testcase again.
+
+    Returns:
+        dict of (device_name, variant) to the violations of that testcase per
+        rule, None for variants skipped as verified, or None when testcases run
+        the deck one by one
+    """
+    config = request.config
+    if not config.getoption("--drc-batch"):
+        return None
+
+    device = config.getoption("--device")
+    fingerprint_skip = not config.getoption("--no-fingerprint-skip")
 
+    file_path = os.path.dirname(os.path.abspath(__file__))
+    drc_dir = rule_deck_dir("drc")
     test_dir = os.path.join(file_path, "testcases")
     patt_dir = os.path.join(file_path, "patterns")
     output_path = os.path.join(test_dir, f"dec_{device}_logs")
-    pattern_log = f"{output_path}/{device_name}_drc.log"
 
-    # Creating output dir
-    os.makedirs(output_path, exist_ok=True)
+    # testcases of this session, after sharding and selection
+    device_names = sorted(
+        {
+            item.callspec.params["device_name"]
+            for item in request.session.items
+            if item.originalname == "test_drc_run"
+        }
+    )
 
-    yaml_file = f"{patt_dir}/{device}/{device_name}_patterns.yaml"
+    # testcases to check with every variant
+    batches = {}
+    batch_names = {}
+    fingerprints = {}
+    results = {}
+
+    for device_name in device_names:
+        gds_file = f"{test_dir}/{device_name}_pcells.gds"
+        if not os.path.isfile(gds_file):
+            continue
+
+        fingerprint = testcase_fingerprint(gds_file, deck_dir=drc_dir)
+        fingerprints[device_name] = fingerprint
+
+        for var in drc_variants(patt_dir, device, device_name):
+            key = f"drc/{device_name}/{var}"
+            if fingerprint_skip and is_verified(key, fingerprint):
+                results[(device_name, var)] = None
+                continue
+            batches.setdefault(var, []).append(gds_file)
+            batch_names.setdefault(var, []).append(device_name)
+
+    jobs = []
+    tiles = {}
+
+    for var, gds_files in sorted(batches.items()):
+        run_dir = os.path.join(output_path, f"batch_{var}")
+        shutil.rmtree(run_dir, ignore_errors=True)
+        os.makedirs(run_dir)
+
+        batch_gds = os.path.join(run_dir, f"{device}_batch_{var}.gds")
+        tiles[var] = pack_testcases(gds_files, batch_gds)
+
+        jobs.append(
+            (
+                [
+                    sys.executable,
+                    f"{drc_dir}/run_drc.py",
+                    f"--path={batch_gds}",
+                    f"--variant={var}",
+                    f"--run_dir={run_dir}",
+                    "--antenna",
+                    "--no_offgrid",
+                ],
+                f"{run_dir}/{device}_batch_{var}_drc.log",
+            )
+        )
+
+    checks = tool_runner.run(jobs)
+
+    for (var, var_tiles), check in zip(sorted(tiles.items()), checks):
+        run_dir = os.path.join(output_path, f"batch_{var}")
+        lyrdb_files = sorted(
+            glob.glob(os.path.join(run_dir, "**", "*.lyrdb"), recursive=True)
+        )
+
+        violations = split_violations(lyrdb_files, var_tiles)
+
+        # a deck failure without results, or violations outside of every
+        # tile, can't be blamed on one testcase
+        shared = dict(violations.get(None, {}))
+        if check != 0 and not lyrdb_files:
+            shared["deck failed, see batch log"] = 1
+
+        for device_name in batch_names[var]:
+            # empty testcases were left out of the batch, there is nothing to
+            # check, like a deck run on an empty gds
+            if var_tiles[device_name] is None:
+                logging.warning("%s has no shapes, drc %s not run", device_name, var)
+                results[(device_name, var)] = {}
+                continue
+
+            results[(device_name, var)] = {**violations.get(device_name, {}), **shared}
+
+    for (device_name, var), violations in results.items():
+        if violations == {}:
+            mark_verified(f"drc/{device_name}/{var}", fingerprints[device_name])
+
+    return results
 
-    if os.path.isfile(yaml_file):
-        with open(yaml_file) as file:
-            try:
-                var_data = yaml.safe_load(file)
-                variant = var_data[device_name]["variant"]
-            except yaml.YAMLError as exc:
-                print(exc)
 
-        call_str = f"""
-        python3 {drc_dir}/run_drc.py --path={test_dir}/{device_name}_pcells.gds --variant={variant} --antenna  --no_offgrid > {pattern_log}
-        """
+@pytest.mark.dependency()
+def test_pcell_generation(request, device, tool_runner):
+    """
+    generate gds and cdl files for device under test from a single pattern read
 
-        check = check_call(call_str, shell=True)
+    Args:
+        request : pytest request fixture
+        device : name of the device under test
+        tool_runner : session runner of the external tools
+    """
 
-    else:
+    file_path = os.path.dirname(os.path.abspath(__file__))
+    output_path = os.path.join(file_path, "testcases")
+    os.makedirs(output_path, exist_ok=True)
 
-        # run drc command string on vaiants A,B and C
-        call_strA = f"""
-        python3 {drc_dir}/run_drc.py --path={test_dir}/{device_name}_pcells.gds --variant=A --antenna  --no_offgrid > {pattern_log}
-        """
+    # gds and cdl generation command
+    call_args = [
+        sys.executable,
+        os.path.join(file_path, "pcell_gen.py"),
+        f"--device={device}",
+    ]
 
-        call_strB = f"""
-        python3 {drc_dir}/run_drc.py --path={test_dir}/{device_name}_pcells.gds --variant=B --antenna  --no_offgrid > {pattern_log}
-        """
+    if request.config.getoption("--hier"):
+        call_args.append("--hier")
 
-        call_strC = f"""
-        python3 {drc_dir}/run_drc.py --path={test_dir}/{device_name}_pcells.gds --variant=C --antenna  --no_offgrid > {pattern_log}
-        """
+    if request.config.getoption("--smoke"):
+        call_args.append("--smoke")
 
-        check = (
-            (check_call(call_strA, shell=True)) or check_call(call_strB, shell=True)
-        ) or check_call(call_strC, shell=True)
+    shard_count = request.config.getoption("--shard-count")
+    if shard_count > 1:
+        call_args += [
+            f"--shard-index={request.config.getoption('--shard-index')}",
+            f"--shard-count={shard_count}",
+        ]
 
-    assert bool(check) == 0
+    (check,) = tool_runner.run([(call_args, f"{output_path}/{device}_gen.log")])
+
+    # assert whether generation is passed
+    assert check == 0
 
 
-@pytest.mark.dependency(depends=["test_gds_generation", "test_cdl_generation"])
-def test_lvs_run(device, device_name):
+@pytest.mark.dependency(depends=["test_pcell_generation"])
+def test_drc_run(
+    device, device_name, tool_runner, quick_drc, fingerprint_skip, drc_batch
+):
     """
-    run lvs testing for device under test testcases
+    run drc testing for device under test testcases
 
     Args:
         device : name of the device under test
         device_name : name of device testcase to be tested
+        tool_runner : session runner of the external tools
+        quick_drc : whether to screen the testcase with the quick drc first
+        fingerprint_skip : whether to skip variants already verified clean
+        drc_batch : violations of the batched drc runs, None when not batched
     """
+    # get drc rule_deck path , testing dir path
 
-    # get lvs rule_deck path , testing dir path
     file_path = os.path.dirname(os.path.abspath(__file__))
+    drc_dir = rule_deck_dir("drc")
 
-    root_path = os.path.dirname(
-        os.path.dirname(os.path.dirname(os.path.dirname(file_path)))
+    test_dir = os.path.join(file_path, "testcases")
+    patt_dir = os.path.join(file_path, "patterns")
+    output_path = os.path.join(test_dir, f"dec_{device}_logs")
+
+    # Creating output dir
+    os.makedirs(output_path, exist_ok=True)
+
+    # run drc on the forced variant, or on variants A,B and C
+    var_list = drc_variants(patt_dir, device, device_name)
+
+    # the batch already skipped verified variants and ran the deck on the
+    # others, as tiles of one gds
+    if drc_batch is not None:
+        verdicts = {
+            var: drc_batch.get((device_name, var), {"not in drc batch": 1})
+            for var in var_list
+        }
+
+        failed = {var: violations for var, violations in verdicts.items() if violations}
+        assert not failed, f"drc violations: {failed}"
+
+        if all(violations is None for violations in verdicts.values()):
+            pytest.skip("geometry unchanged since last clean drc")
+        return
+
+    # skip variants whose geometry was already verified clean
+    fingerprint = testcase_fingerprint(
+        f"{test_dir}/{device_name}_pcells.gds", deck_dir=drc_dir
     )
+    if fingerprint_skip:
+        var_list = [
+            var
+            for var in var_list
+            if not is_verified(f"drc/{device_name}/{var}", fingerprint)
+        ]
+        if not var_list:
+            pytest.skip("geometry unchanged since last clean drc")
+
+    # reject obvious failures before queuing the full deck
+    if quick_drc:
+        violations = quick_drc_file(f"{test_dir}/{device_name}_pcells.gds")
+        assert not violations, f"quick drc failed: {violations}"
+
+    jobs = [
+        (
+            [
+                sys.executable,
+                f"{drc_dir}/run_drc.py",
+                f"--path={test_dir}/{device_name}_pcells.gds",
+                f"--variant={var}",
+                f"--run_dir={output_path}/{device_name}_{var}",
+                "--antenna",
+                "--no_offgrid",
+            ],
+            f"{output_path}/{device_name}_{var}_drc.log",
+        )
+        for var in var_list
+    ]
+
+    checks = tool_runner.run(jobs)
+
+    for var, check in zip(var_list, checks):
+        if check == 0:
+            mark_verified(f"drc/{device_name}/{var}", fingerprint)
+
+    assert not any(checks)
+
+
+@pytest.mark.dependency(depends=["test_pcell_generation"])
+def test_lvs_run(device, device_name, tool_runner, fingerprint_skip):
+    """
+    run lvs testing for device under test testcases
 
-    lvs_path = "globalfoundries-pdk-libs-gf180mcu_fd_pv/klayout/lvs"
-    lvs_dir = os.path.join(root_path, lvs_path)
+    Args:
+        device : name of the device under test
+        device_name : name of device testcase to be tested
+        tool_runner : session runner of the external tools
+        fingerprint_skip : whether to skip variants already verified clean
+    """
+
+    # get lvs rule_deck path , testing dir path
+    file_path = os.path.dirname(os.path.abspath(__file__))
+    lvs_dir = rule_deck_dir("lvs")
 
     test_dir = os.path.join(file_path, "testcases")
     output_path = os.path.join(test_dir, f"lvs_{device}_logs")
     patt_dir = os.path.join(file_path, "patterns")
-    pattern_log = f"{output_path}/{device_name}_lvs.log"
 
     # Creating output dir
     os.makedirs(output_path, exist_ok=True)
 
-    yaml_file = f"{patt_dir}/{device}/{device_name}_patterns.yaml"
+    variant = read_variant(patt_dir, device, device_name)
+    if variant == "E":
+        variant = "A"
 
-    lvs_res = []
+    # run lvs on the forced variant, or on variants A,B and C
+    var_list = [variant] if variant else ["A", "B", "C"]
 
-    if os.path.isfile(yaml_file):
-        with open(yaml_file) as file:
-            try:
-                var_data = yaml.safe_load(file)
-                variant = var_data[device_name]["variant"]
-                if variant == "E":
-                    variant = "A"
-            except yaml.YAMLError as exc:
-                print(exc)
+    # skip variants whose geometry and netlist were already verified clean
+    fingerprint = testcase_fingerprint(
+        f"{test_dir}/{device_name}_pcells.gds",
+        cdl_file=f"{test_dir}/{device_name}_pcells.cdl",
+        deck_dir=lvs_dir,
+    )
+    if fingerprint_skip:
+        var_list = [
+            var
+            for var in var_list
+            if not is_verified(f"lvs/{device_name}/{var}", fingerprint)
+        ]
+        if not var_list:
+            pytest.skip("geometry and netlist unchanged since last clean lvs")
+
+    jobs = [
+        (
+            [
+                sys.executable,
+                f"{lvs_dir}/run_lvs.py",
+                f"--layout={test_dir}/{device_name}_pcells.gds",
+                f"--netlist={test_dir}/{device_name}_pcells.cdl",
+                f"--variant={var}",
+                f"--run_dir={output_path}/{device_name}_{var}",
+            ],
+            f"{output_path}/{device_name}_{var}_lvs.log",
+        )
+        for var in var_list
+    ]
+
+    checks = tool_runner.run(jobs)
 
-        call_str = f"""
-    python3 {lvs_dir}/run_lvs.py --layout={test_dir}/{device_name}_pcells.gds --netlist={test_dir}/{device_name}_pcells.cdl --variant={variant} > {pattern_log}
-    """
+    lvs_res = []
 
-        check_call(call_str, shell=True)
+    for var, check, (_, pattern_log) in zip(var_list, checks, jobs):
 
         # read output log of lvs run
         f = open(pattern_log)
@@ -167,34 +406,12 @@ def test_lvs_run(device, device_name):
         f.close()
         print(log_data[-2])
 
-        if "ERROR" in log_data[-2]:
+        # a crashed run fails even if its log ends like a clean one
+        if check != 0 or "ERROR" in log_data[-2]:
             lvs_res.append(1)
         else:
             lvs_res.append(0)
-
-    else:
-
-        var_list = ["A", "B", "C"]
-
-        for variant in var_list:
-
-            # run lvs command string
-            call_str = f"""
-            python3 {lvs_dir}/run_lvs.py --layout={test_dir}/{device_name}_pcells.gds --netlist={test_dir}/{device_name}_pcells.cdl --variant=A > {pattern_log}
-            """
-
-            check_call(call_str, shell=True)
-
-            # read output log of lvs run
-            f = open(pattern_log)
-            log_data = f.readlines()
-            f.close()
-            print(log_data[-2])
-
-            if "ERROR" in log_data[-2]:
-                lvs_res.append(1)
-            else:
-                lvs_res.append(0)
+            mark_verified(f"lvs/{device_name}/{var}", fingerprint)
 
     if 1 in lvs_res:
         assert False
@@ -0,0 +1,141 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## Quick pre-DRC screening for generated pcells
+########################################################################################################################
+
+"""
+Globalfoundries 180u PCells quick DRC.
+
+Runs a small subset of width / space / enclosure rules in-process with
+multithreaded KLayout regions, to reject obviously broken layouts before
+the full DRC deck is queued.
+
+Usage:
+    quick_drc.py (--help| -h)
+    quick_drc.py (--path=<file_path>) [--rules=<rules_file>] [--thr=<thr>]
+
+Options:
+    --help -h                   Print this help message.
+    --path=<file_path>          The input GDS file path.
+    --rules=<rules_file>        Json file with the layers and rules to check (default: quick_drc.json next to this script).
+    --thr=<thr>                 The number of threads used in run.
+"""
+
+import os
+import sys
+import json
+import logging
+import klayout.db as k
+from docopt import docopt
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quick_drc.json")
+
+
+def load_rules(rules_file=RULES_FILE):
+    """
+    Reads the quick drc layers and rules
+
+    Args :
+        rules_file : json file with "layers" and "rules" entries
+    """
+    with open(rules_file) as f:
+        return json.load(f)
+
+
+def quick_drc(layout, rules, threads=None):
+    """
+    Checks the top cell of a layout against a small set of rules
+
+    Args :
+        layout : layout object
+        rules : dict with "layers" {name: [layer, datatype]} and "rules" list
+        threads : number of threads used by the region operations
+
+    Returns :
+        dict of rule name to number of violations, only for violated rules
+    """
+    top = layout.top_cell()
+
+    dss = k.DeepShapeStore()
+    dss.threads = threads or os.cpu_count() or 1
+
+    # Missing layers are created empty so every region stays in deep mode
+    regions = {}
+    for name, (layer, datatype) in rules["layers"].items():
+        li = layout.layer(layer, datatype)
+        regions[name] = k.Region(top.begin_shapes_rec(li), dss)
+
+    violations = {}
+
+    for rule in rules["rules"]:
+        region = regions[rule["layer"]]
+        value = int(round(rule["value"] / layout.dbu))
+
+        if rule["check"] == "width":
+            errors = region.width_check(value)
+        elif rule["check"] == "space":
+            errors = region.space_check(value)
+        elif rule["check"] == "enclosure":
+            inner = regions[rule["inner"]].interacting(region)
+            errors = region.enclosing_check(inner, value)
+        else:
+            raise ValueError(f"Unknown quick drc check {rule['check']}")
+
+        count = errors.count()
+        if count:
+            violations[rule["name"]] = count
+            logging.error("%s: %d violations", rule["name"], count)
+
+    return violations
+
+
+def quick_drc_file(gds_file, rules_file=RULES_FILE, threads=None):
+    """
+    Runs the quick drc on a gds file
+
+    Args :
+        gds_file : input gds file path
+        rules_file : json rules file
+        threads : number of threads used by the region operations
+    """
+    layout = k.Layout()
+    layout.read(gds_file)
+
+    return quick_drc(layout, load_rules(rules_file), threads)
+
+
+if __name__ == "__main__":
+
+    # logs format
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS quick DRC: 0.1")
+    thr = int(arguments["--thr"]) if arguments["--thr"] else None
+
+    rules_file = arguments["--rules"] or RULES_FILE
+
+    violations = quick_drc_file(arguments["--path"], rules_file, thr)
+
+    if violations:
+        logging.error("Quick DRC failed on %s", arguments["--path"])
+        sys.exit(1)
+
+    logging.info("Quick DRC clean on %s", arguments["--path"])
@@ -0,0 +1,120 @@
+########################################################################################################################
+## Tests of the quick pre-DRC screening
+########################################################################################################################
+
+import klayout.db as k
+import pytest
+
+from quick_drc import load_rules, quick_drc
+
+# quick drc layers
+COMP = (22, 0)
+POLY2 = (30, 0)
+CONTACT = (33, 0)
+METAL1 = (34, 0)
+
+# contact with comp and metal1 enclosures exactly at the rules minimum
+CONTACT_BOX = (0, 0, 0.22, 0.22)
+COMP_BOX = (-0.07, -0.07, 0.29, 0.29)
+METAL1_BOX = (-0.005, -0.005, 0.225, 0.225)
+
+
+@pytest.fixture(scope="module")
+def rules():
+    """
+    Quick drc rules shipped next to the script
+    """
+    return load_rules()
+
+
+def make_layout(shapes):
+    """
+    Returns a layout with one top cell holding the given boxes
+
+    Args :
+        shapes : list of (layer, datatype), (left, bottom, right, top) boxes in um
+    """
+    layout = k.Layout()
+    layout.dbu = 0.001
+    top = layout.create_cell("quick_drc")
+
+    for (layer, datatype), box in shapes:
+        top.shapes(layout.layer(layer, datatype)).insert(k.DBox(*box))
+
+    return layout
+
+
+def test_clean_stack(rules):
+    shapes = [(CONTACT, CONTACT_BOX), (COMP, COMP_BOX), (METAL1, METAL1_BOX)]
+
+    assert quick_drc(make_layout(shapes), rules, threads=1) == {}
+
+
+def test_comp_overlap(rules):
+    # two contacts 0.2 um apart, with only 0.03 um of comp around them
+    shapes = [
+        (CONTACT, CONTACT_BOX),
+        (CONTACT, (0.42, 0, 0.64, 0.22)),
+        (COMP, (-0.03, -0.03, 0.67, 0.25)),
+        (METAL1, (-0.005, -0.005, 0.645, 0.225)),
+    ]
+
+    assert set(quick_drc(make_layout(shapes), rules, threads=1)) == {"CO.4", "CO.2a"}
+
+
+@pytest.mark.parametrize(
+    "rule, layer, box",
+    [
+        ("DF.1a", COMP, (0, 0, 0.2, 1)),
+        ("PL.1", POLY2, (0, 0, 0.16, 1)),
+        ("CO.1", CONTACT, (0, 0, 0.2, 0.3)),
+        ("M1.1", METAL1, (0, 0, 0.2, 1)),
+    ],
+)
+def test_width(rules, rule, layer, box):
+    assert quick_drc(make_layout([(layer, box)]), rules, threads=1) == {rule: 1}
+
+
+@pytest.mark.parametrize(
+    "rule, layer, space",
+    [("DF.3a", COMP, 0.27), ("PL.3a", POLY2, 0.23), ("M1.2a", METAL1, 0.22)],
+)
+def test_space(rules, rule, layer, space):
+    shapes = [(layer, (0, 0, 1, 1)), (layer, (1 + space, 0, 2 + space, 1))]
+
+    assert quick_drc(make_layout(shapes), rules, threads=1) == {rule: 1}
+
+    shapes = [(layer, (0, 0, 1, 1)), (layer, (1.3, 0, 2.3, 1))]
+
+    assert quick_drc(make_layout(shapes), rules, threads=1) == {}
+
+
+@pytest.mark.parametrize(
+    "rule, layer, box",
+    [
+        ("CO.4", COMP, (-0.06, -0.07, 0.29, 0.29)),
+        ("CO.5a", POLY2, (-0.07, -0.07, 0.29, 0.28)),
+        ("CO.6", METAL1, (-0.004, -0.005, 0.23, 0.225)),
+    ],
+)
+def test_enclosure(rules, rule, layer, box):
+    enclosures = {COMP: COMP_BOX, METAL1: METAL1_BOX}
+    enclosures[layer] = box
+
+    shapes = [(CONTACT, CONTACT_BOX)] + list(enclosures.items())
+
+    assert quick_drc(make_layout(shapes), rules, threads=1) == {rule: 1}
+
+
+def test_missing_layer(rules):
+    # only comp is drawn, the other rule layers are missing from the layout
+    layout = make_layout([(COMP, (0, 0, 0.2, 1))])
+
+    assert layout.find_layer(*METAL1) is None
+
+    assert quick_drc(layout, rules, threads=1) == {"DF.1a": 1}
+
+    # a contact with no enclosing layer is not an enclosure violation
+    layout = make_layout([(CONTACT, CONTACT_BOX)])
+
+    assert quick_drc(layout, rules, threads=1) == {}
@@ -0,0 +1,280 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## Pcells regression sharding across CI nodes
+########################################################################################################################
+
+"""
+Globalfoundries 180u PCells regression sharding.
+
+Pattern files of all devices are split across shards by their historical
+cost, so every node gets about the same amount of work. Results of all
+shards are merged back into one regression report.
+
+Usage:
+    shard.py (--help| -h)
+    shard.py list (--shard-index=<index>) (--shard-count=<count>) [--device=<device_name>]
+    shard.py merge (--out=<out_dir>) [--update-costs] <shard_dir>...
+
+Options:
+    --help -h                   Print this help message.
+    --shard-index=<index>       Index of this shard, from 0 to shard count - 1.
+    --shard-count=<count>       Total number of shards.
+    --device=<device_name>      Only list pattern files of this device.
+    --out=<out_dir>             Output directory of the merged testcases and report.
+    --update-costs              Store the merged test durations as the new sharding costs.
+    <shard_dir>                 Testcases directories collected from every shard.
+"""
+
+import os
+import sys
+import glob
+import json
+import shutil
+import logging
+from docopt import docopt
+
+from verified_cache import CACHE_FILE, load_verified
+
+PATTERNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "patterns")
+COSTS_FILE = os.path.join(PATTERNS_DIR, "shard_costs.json")
+REPORTS_DIR = "reports"
+
+# generation logs, written by every shard that got a pattern file of the device
+GEN_LOGS = "*_gen.log"
+
+
+def pattern_name(patt_file):
+    """
+    Returns the testcase name of a pattern file
+
+    Args :
+        patt_file : patterns csv file path
+    """
+    return patt_file.split("/")[-1].split("_patt")[0]
+
+
+def load_costs(costs_file=COSTS_FILE):
+    """
+    Reads the historical cost of every testcase, empty if there is no history yet
+
+    Args :
+        costs_file : json file of testcase name to cost
+    """
+    if not os.path.isfile(costs_file):
+        return {}
+
+    with open(costs_file) as f:
+        return json.load(f)
+
+
+def pattern_rows(patt_file):
+    """
+    Returns the number of patterns of a pattern file
+
+    Args :
+        patt_file : patterns csv file path
+    """
+    with open(patt_file) as f:
+        return sum(1 for _ in f) - 1
+
+
+def file_costs(patt_files, costs):
+    """
+    Returns the cost of every pattern file, in seconds once there is history
+
+    Testcases without history are estimated from their number of patterns,
+    at the mean seconds per pattern of the testcases with history, so both
+    kinds of costs add up in the same unit.
+
+    Args :
+        patt_files : list of pattern file paths
+        costs : dict of testcase name to measured seconds
+    """
+    rows = [pattern_rows(p) for p in patt_files]
+    known = [costs.get(pattern_name(p)) for p in patt_files]
+
+    known_rows = sum(n for n, cost in zip(rows, known) if cost is not None)
+    known_cost = sum(cost for cost in known if cost is not None)
+
+    # without any history every pattern costs the same
+    rate = known_cost / known_rows if known_rows else 1.0
+
+    return [cost if cost is not None else n * rate for n, cost in zip(rows, known)]
+
+
+def shard_files(shard_index, shard_count, costs=None, patterns_dir=PATTERNS_DIR):
+    """
+    Returns the pattern files assigned to one shard
+
+    Files are assigned greedily, most expensive first, to the least loaded
+    shard. The result only depends on the pattern files and the costs, so
+    every node computes the same partition.
+
+    Args :
+        shard_index : index of the shard, from 0 to shard_count - 1
+        shard_count : total number of shards
+        costs : dict of testcase name to cost, defaults to the stored history
+        patterns_dir : patterns directory path
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"shard index {shard_index} out of range 0-{shard_count - 1}")
+
+    if costs is None:
+        costs = load_costs()
+
+    patt_files = sorted(glob.glob(os.path.join(patterns_dir, "*", "*.csv")))
+    weighted = zip(file_costs(patt_files, costs), patt_files)
+
+    loads = [0.0] * shard_count
+    assigned = []
+
+    for cost, p in sorted(weighted, key=lambda item: (-item[0], item[1])):
+        shard = loads.index(min(loads))
+        loads[shard] += cost
+        if shard == shard_index:
+            assigned.append(p)
+
+    return sorted(assigned)
+
+
+def merge_shards(shard_dirs, out_dir):
+    """
+    Collects testcases and results of all shards into one directory and report
+
+    Generation logs are kept per shard, as <device>_gen_shard_<i>.log with i
+    the position of the shard in shard_dirs, and the verified fingerprints
+    caches of all shards are merged into one.
+
+    Args :
+        shard_dirs : testcases directories of every shard
+        out_dir : merged output directory
+
+    Returns :
+        merged report dict
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    cache_name = os.path.basename(CACHE_FILE)
+
+    results = []
+    shards = []
+    verified = {}
+
+    for index, shard_dir in enumerate(shard_dirs):
+
+        # Copy gds, cdl and drc / lvs logs, shards never share testcases
+        shutil.copytree(
+            shard_dir,
+            out_dir,
+            dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns(REPORTS_DIR, GEN_LOGS, f"{cache_name}*"),
+        )
+
+        # Every shard writes the generation log of its devices, keep them all
+        for log_file in sorted(glob.glob(os.path.join(shard_dir, GEN_LOGS))):
+            name, ext = os.path.splitext(os.path.basename(log_file))
+            shutil.copy(log_file, os.path.join(out_dir, f"{name}_shard_{index}{ext}"))
+
+        # and its verified cache, the merged cache is the union of them
+        verified.update(load_verified(os.path.join(shard_dir, cache_name)))
+
+        for report_file in sorted(
+            glob.glob(os.path.join(shard_dir, REPORTS_DIR, "*.json"))
+        ):
+            with open(report_file) as f:
+                report = json.load(f)
+            shards.append(os.path.basename(report_file))
+            results.extend(report["results"])
+
+    failed = [r["nodeid"] for r in results if r["outcome"] == "failed"]
+
+    merged = {
+        "shards": shards,
+        "passed": sum(r["outcome"] == "passed" for r in results),
+        "failed": len(failed),
+        "skipped": sum(r["outcome"] == "skipped" for r in results),
+        "failures": failed,
+        "results": results,
+    }
+
+    with open(os.path.join(out_dir, "regression_report.json"), "w") as f:
+        json.dump(merged, f, indent=2)
+
+    if verified:
+        with open(os.path.join(out_dir, cache_name), "w") as f:
+            json.dump(verified, f, indent=2, sort_keys=True)
+
+    return merged
+
+
+def testcase_costs(results):
+    """
+    Sums the test durations of every testcase, used as its sharding cost
+
+    Args :
+        results : list of test results of the merged report
+    """
+    costs = {}
+
+    for r in results:
+        if r["device_name"]:
+            costs[r["device_name"]] = costs.get(r["device_name"], 0) + r["duration"]
+
+    return {name: round(cost, 3) for name, cost in sorted(costs.items())}
+
+
+if __name__ == "__main__":
+
+    # logs format
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS shard: 0.1")
+
+    if arguments["list"]:
+        files = shard_files(
+            int(arguments["--shard-index"]), int(arguments["--shard-count"])
+        )
+        device = arguments["--device"]
+        for p in files:
+            if device is None or os.path.basename(os.path.dirname(p)) == device:
+                print(pattern_name(p))
+
+    else:
+        merged = merge_shards(arguments["<shard_dir>"], arguments["--out"])
+
+        if arguments["--update-costs"]:
+            costs = load_costs()
+            costs.update(testcase_costs(merged["results"]))
+            with open(COSTS_FILE, "w") as f:
+                json.dump(costs, f, indent=2, sort_keys=True)
+
+        logging.info(
+            "Merged %d shards: %d passed, %d failed, %d skipped",
+            len(merged["shards"]),
+            merged["passed"],
+            merged["failed"],
+            merged["skipped"],
+        )
+
+        if merged["failed"]:
+            for nodeid in merged["failures"]:
+                logging.error("FAILED %s", nodeid)
+            sys.exit(1)
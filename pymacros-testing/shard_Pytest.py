@@ -0,0 +1,194 @@
+########################################################################################################################
+## Tests of the regression sharding and shard merge
+########################################################################################################################
+
+import json
+import os
+
+import pytest
+
+import shard
+from shard import REPORTS_DIR, file_costs, merge_shards, shard_files
+
+# testcase name to number of patterns of the test patterns directory
+PATTERN_ROWS = {
+    "fet": {"nfet_03v3": 40, "nfet_05v0": 25, "pfet_03v3": 40, "pfet_05v0": 10},
+    "res": {"nwell": 60, "pwell": 5, "npolyf_s": 30, "ppolyf_s": 15, "rm1": 8},
+}
+
+
+@pytest.fixture
+def patterns_dir(tmp_path):
+    """
+    Patterns directory with csv files of known sizes
+    """
+    for device, testcases in PATTERN_ROWS.items():
+        os.makedirs(tmp_path / device)
+        for name, rows in testcases.items():
+            lines = ["pcell_name"] + [f"p{i}" for i in range(rows)]
+            (tmp_path / device / f"{name}_patterns.csv").write_text("\n".join(lines))
+
+    return str(tmp_path)
+
+
+def partition(patterns_dir, shard_count, costs):
+    """
+    Returns the pattern files of every shard
+
+    Args :
+        patterns_dir : patterns directory path
+        shard_count : total number of shards
+        costs : dict of testcase name to cost
+    """
+    return [
+        shard_files(i, shard_count, costs=costs, patterns_dir=patterns_dir)
+        for i in range(shard_count)
+    ]
+
+
+@pytest.mark.parametrize("shard_count", [1, 2, 3, 4, 9])
+def test_every_file_in_one_shard(patterns_dir, shard_count):
+    shards = partition(patterns_dir, shard_count, {})
+
+    files = [p for patt_files in shards for p in patt_files]
+    names = [os.path.basename(p).split("_patt")[0] for p in files]
+
+    assert len(files) == len(set(files))
+    assert sorted(names) == sorted(n for t in PATTERN_ROWS.values() for n in t)
+
+
+def test_partition_is_deterministic(patterns_dir):
+    costs = {"nfet_03v3": 120.0, "nwell": 90.0, "rm1": 3.5}
+
+    first = partition(patterns_dir, 3, costs)
+
+    # same costs given in another order, as read back from another node
+    shuffled = dict(reversed(list(costs.items())))
+
+    assert partition(patterns_dir, 3, shuffled) == first
+    assert partition(patterns_dir, 3, costs) == first
+
+
+@pytest.mark.parametrize("shard_count", [2, 3, 4])
+def test_partition_is_balanced(patterns_dir, shard_count):
+    names = [n for t in PATTERN_ROWS.values() for n in t]
+    costs = {name: float(len(name) * 7 % 23 + 1) for name in names}
+
+    loads = []
+    for patt_files in partition(patterns_dir, shard_count, costs):
+        loads.append(
+            sum(costs[os.path.basename(p).split("_patt")[0]] for p in patt_files)
+        )
+
+    # greedy on sorted costs: shards differ by at most the largest cost
+    assert max(loads) - min(loads) <= max(costs.values())
+
+
+def test_costs_without_history_in_seconds(patterns_dir):
+    files = sorted(
+        os.path.join(patterns_dir, device, f"{name}_patterns.csv")
+        for device, testcases in PATTERN_ROWS.items()
+        for name in testcases
+    )
+    names = [os.path.basename(p).split("_patt")[0] for p in files]
+
+    # 2 seconds per pattern measured on nfet_03v3 and nwell
+    costs = file_costs(files, {"nfet_03v3": 80.0, "nwell": 120.0})
+    by_name = dict(zip(names, costs))
+
+    assert by_name["nfet_03v3"] == 80.0
+    assert by_name["nwell"] == 120.0
+    assert by_name["pwell"] == pytest.approx(10.0)
+    assert by_name["pfet_03v3"] == pytest.approx(80.0)
+
+
+def test_costs_without_any_history(patterns_dir):
+    files = [
+        os.path.join(patterns_dir, "res", f"{name}_patterns.csv")
+        for name in ("nwell", "rm1")
+    ]
+
+    assert file_costs(files, {}) == [60, 8]
+
+
+def test_shard_index_out_of_range(patterns_dir):
+    with pytest.raises(ValueError):
+        shard_files(2, 2, costs={}, patterns_dir=patterns_dir)
+
+
+def write_shard(shard_dir, index, results):
+    """
+    Writes the testcases directory of one shard with its report
+
+    Args :
+        shard_dir : testcases directory of the shard
+        index : shard index
+        results : test results of the shard
+    """
+    os.makedirs(shard_dir / REPORTS_DIR)
+
+    for r in results:
+        (shard_dir / f"{r['device_name']}_pcells.gds").write_text("gds")
+
+    # files every shard writes
+    (shard_dir / "res_gen.log").write_text(f"shard {index}")
+    with open(shard_dir / "verified_fingerprints.json", "w") as f:
+        json.dump({f"drc/{r['device_name']}/A": r["nodeid"] for r in results}, f)
+
+    report = {
+        "device": "res",
+        "shard_index": index,
+        "shard_count": 2,
+        "results": results,
+    }
+    with open(shard_dir / REPORTS_DIR / f"res_shard_{index}_of_2.json", "w") as f:
+        json.dump(report, f)
+
+
+def test_merge_shards(tmp_path):
+    write_shard(
+        tmp_path / "shard0",
+        0,
+        [
+            {
+                "nodeid": "a",
+                "device_name": "nwell",
+                "outcome": "passed",
+                "duration": 1.5,
+            },
+            {
+                "nodeid": "b",
+                "device_name": "nwell",
+                "outcome": "failed",
+                "duration": 2.0,
+            },
+        ],
+    )
+    write_shard(
+        tmp_path / "shard1",
+        1,
+        [{"nodeid": "c", "device_name": "rm1", "outcome": "skipped", "duration": 0.5}],
+    )
+
+    out_dir = tmp_path / "merged"
+    merged = merge_shards(
+        [str(tmp_path / "shard0"), str(tmp_path / "shard1")], str(out_dir)
+    )
+
+    assert merged["shards"] == ["res_shard_0_of_2.json", "res_shard_1_of_2.json"]
+    assert (merged["passed"], merged["failed"], merged["skipped"]) == (1, 1, 1)
+    assert merged["failures"] == ["b"]
+
+    assert (out_dir / "nwell_pcells.gds").is_file()
+    assert (out_dir / "rm1_pcells.gds").is_file()
+    assert not (out_dir / REPORTS_DIR).exists()
+
+    # shared files are kept per shard or merged, never overwritten
+    assert not (out_dir / "res_gen.log").exists()
+    assert (out_dir / "res_gen_shard_0.log").read_text() == "shard 0"
+    assert (out_dir / "res_gen_shard_1.log").read_text() == "shard 1"
+
+    with open(out_dir / "verified_fingerprints.json") as f:
+        assert json.load(f) == {"drc/nwell/A": "b", "drc/rm1/A": "c"}
+
+    assert shard.testcase_costs(merged["results"]) == {"nwell": 3.5, "rm1": 0.5}
@@ -0,0 +1,174 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## Pcells smoke patterns selection
+########################################################################################################################
+
+"""
+Globalfoundries 180u PCells smoke patterns selection.
+
+Selects a small subset of pattern rows that still covers every pairwise
+combination of the categorical parameters and of the binned continuous
+parameters, plus the min / max of every continuous parameter.
+
+Usage:
+    smoke.py (--help| -h)
+    smoke.py (--device=<device_name>) [--bins=<bins>]
+
+Options:
+    --help -h                   Print this help message.
+    --device=<device_name>      Select your device name. Allowed devices are (bjt , diode, MIM-A, MIM-B_gfB, MIM-B_gfC , fet, cap_mos, res)
+    --bins=<bins>               Number of bins of continuous parameters. [default: 3]
+"""
+
+import os
+import glob
+import itertools
+import numpy as np
+import pandas as pd
+from docopt import docopt
+
+# netlist columns, not pcell parameters
+NETLIST_COLUMNS = [
+    "pcell_name",
+    "netlist_name",
+    "netlist_nets",
+    "netlists_param",
+    "dev_name",
+    "dev_tb",
+]
+
+# numeric parameters with at most this many values are treated as categorical
+MAX_LEVELS = 6
+
+
+def param_levels(df, bins=3, max_levels=MAX_LEVELS):
+    """
+    Encodes the pcell parameters of every pattern as integer levels
+
+    Categorical parameters keep their values, continuous ones are split in
+    quantile bins. Labels and free-form text parameters are left out.
+
+    Args :
+        df : dataframe of patterns
+        bins : number of bins of continuous parameters
+        max_levels : max number of values of a categorical parameter
+
+    Returns :
+        (levels, continuous) with levels an int array of shape (rows, params)
+        and continuous the names of the continuous parameters
+    """
+    columns = []
+    continuous = []
+
+    for col in df.columns:
+        if col in NETLIST_COLUMNS or col == "lbl" or col.endswith("_lbl"):
+            continue
+
+        values = df[col]
+        n_values = values.nunique(dropna=False)
+
+        if n_values <= max_levels:
+            columns.append(pd.factorize(values.astype(str))[0])
+        elif pd.api.types.is_numeric_dtype(values):
+            continuous.append(col)
+            binned = pd.qcut(values.rank(method="first"), bins, labels=False)
+            columns.append(binned.fillna(bins).to_numpy())
+
+    if not columns:
+        return np.zeros((df.shape[0], 0), dtype=np.int64), continuous
+
+    return np.stack(columns, axis=1).astype(np.int64), continuous
+
+
+def smoke_rows(df, bins=3, max_levels=MAX_LEVELS):
+    """
+    Selects a small subset of patterns covering all pairs of parameter levels
+
+    Args :
+        df : dataframe of patterns
+        bins : number of bins of continuous parameters
+        max_levels : max number of values of a categorical parameter
+
+    Returns :
+        subset of df with its original index, in file order
+    """
+    levels, continuous = param_levels(df, bins, max_levels)
+    rows_no, params_no = levels.shape
+
+    if rows_no == 0 or params_no == 0:
+        return df.iloc[:1]
+
+    # every pair of parameters, or the single one
+    pairs = list(itertools.combinations(range(params_no), 2)) or [(0, 0)]
+    sizes = levels.max(axis=0) + 1
+
+    # pair code of every row and which codes are still to be covered
+    codes = np.stack(
+        [levels[:, a] * sizes[b] + levels[:, b] for a, b in pairs], axis=1
+    )
+    uncovered = [np.zeros(sizes[a] * sizes[b], dtype=bool) for a, b in pairs]
+    for p, mask in enumerate(uncovered):
+        mask[codes[:, p]] = True
+
+    def take(row):
+        for p, mask in enumerate(uncovered):
+            mask[codes[row, p]] = False
+
+    # extremes of continuous parameters first
+    positions = {
+        df.index.get_loc(i)
+        for c in continuous
+        for i in (df[c].idxmin(), df[c].idxmax())
+    }
+    for row in positions:
+        take(row)
+
+    selected = set(positions)
+
+    # then greedily the row covering most of the remaining pairs
+    while True:
+        gain = np.zeros(rows_no, dtype=np.int64)
+        for p, mask in enumerate(uncovered):
+            gain += mask[codes[:, p]]
+
+        row = int(gain.argmax())
+        if gain[row] == 0:
+            break
+
+        take(row)
+        selected.add(row)
+
+    return df.iloc[sorted(selected)]
+
+
+if __name__ == "__main__":
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS smoke: 0.1")
+    device = arguments["--device"]
+    bins = int(arguments["--bins"])
+
+    file_path = os.path.dirname(os.path.abspath(__file__))
+    list_patt_files = glob.glob(os.path.join(file_path, "patterns", device, "*.csv"))
+
+    for p in sorted(list_patt_files):
+        df = pd.read_csv(p)
+        smoke = smoke_rows(df, bins)
+        device_name = p.split("/")[-1].split("_patt")[0]
+        print(
+            f"{device_name}: {smoke.shape[0]}/{df.shape[0]} patterns "
+            f"({100 * smoke.shape[0] / max(df.shape[0], 1):.0f}%)"
+        )
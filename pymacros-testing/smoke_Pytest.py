@@ -0,0 +1,117 @@
+########################################################################################################################
+## Tests of the smoke patterns selection
+########################################################################################################################
+
+import glob
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from smoke import param_levels, smoke_rows
+
+PATTERN_FILES = sorted(
+    glob.glob(
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "patterns", "*", "*.csv"
+        )
+    )
+)
+
+
+def level_pairs(levels):
+    """
+    Returns the set of (param a, param b, level a, level b) of all rows
+
+    Args :
+        levels : int array of parameter levels, shape (rows, params)
+    """
+    pairs = set()
+
+    for a, b in itertools.combinations(range(levels.shape[1]), 2):
+        pairs.update((a, b, x, y) for x, y in zip(levels[:, a], levels[:, b]))
+
+    return pairs
+
+
+def assert_pairwise_covered(df, bins=3):
+    """
+    Checks the smoke subset of df covers every pair of levels of df
+
+    Args :
+        df : dataframe of patterns
+        bins : number of bins of continuous parameters
+    """
+    levels, continuous = param_levels(df, bins)
+    smoke = smoke_rows(df, bins)
+
+    # levels are computed on the full file, then looked up for the subset
+    subset = levels[[df.index.get_loc(i) for i in smoke.index]]
+
+    assert level_pairs(subset) == level_pairs(levels)
+
+    for c in continuous:
+        assert df[c].idxmin() in smoke.index
+        assert df[c].idxmax() in smoke.index
+
+    return smoke
+
+
+@pytest.mark.parametrize(
+    "patt_file", PATTERN_FILES, ids=[os.path.basename(p) for p in PATTERN_FILES]
+)
+def test_shipped_patterns_pairwise_covered(patt_file):
+    df = pd.read_csv(patt_file)
+
+    smoke = assert_pairwise_covered(df)
+
+    assert smoke.index.is_monotonic_increasing
+    assert len(smoke) <= len(df)
+
+
+def test_shipped_patterns_reduced():
+    total = selected = 0
+
+    for patt_file in PATTERN_FILES:
+        df = pd.read_csv(patt_file)
+        total += len(df)
+        selected += len(smoke_rows(df))
+
+    assert selected < total / 4
+
+
+def test_pairwise_covered_on_full_factorial():
+    values = {"a": [1, 2, 3], "b": ["x", "y"], "c": [0.1, 0.2, 0.3], "d": [True, False]}
+    df = pd.DataFrame(list(itertools.product(*values.values())), columns=list(values))
+
+    smoke = assert_pairwise_covered(df)
+
+    # 3 x 3 pairs of a and c need at least 9 rows, far less than the 36
+    assert 9 <= len(smoke) < len(df)
+
+
+def test_continuous_parameters_binned():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "pcell_name": [f"p{i}" for i in range(60)],
+            "w": rng.uniform(0.5, 50, 60),
+            "l": rng.uniform(0.3, 10, 60),
+            "volt": rng.choice(["3.3V", "5V", "6V"], 60),
+        }
+    )
+
+    levels, continuous = param_levels(df)
+
+    assert continuous == ["w", "l"]
+    assert levels.shape == (60, 3)
+
+    assert_pairwise_covered(df)
+
+
+def test_no_parameters_keeps_one_row():
+    df = pd.DataFrame({"pcell_name": ["a", "b"], "lbl": [0, 1]})
+
+    assert list(smoke_rows(df).index) == [0]
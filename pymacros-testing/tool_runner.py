@@ -0,0 +1,156 @@
+########################################################################################################################
+## Asyncio runner for external DRC / LVS tools
+########################################################################################################################
+
+import asyncio
+import logging
+import os
+import re
+
+# run_drc.py / run_lvs.py log as "<date> | <LEVEL> | <message>"
+TOOL_LOG_LINE = re.compile(r"\|\s*(DEBUG|INFO|WARNING|ERROR)\s*\|\s*(.*)$")
+
+DEFAULT_TIMEOUT = 3600
+
+
+class ToolTimeout(Exception):
+    """
+    Raised when an external tool runs longer than its timeout
+    """
+
+
+def log_progress(name, line):
+    """
+    Forwards the log lines of an external tool to the logging module
+
+    Args :
+        name : name of the job the line belongs to
+        line : decoded output line of the tool
+    """
+    match = TOOL_LOG_LINE.search(line)
+    if match:
+        level, message = match.groups()
+        logging.log(logging.getLevelName(level), "%s | %s", name, message)
+
+
+async def run_tool(
+    args, log_file, name=None, timeout=DEFAULT_TIMEOUT, progress=log_progress, limit=None
+):
+    """
+    Runs one external tool without a shell, streaming its output into a log file
+
+    Args :
+        args : command line as a list of arguments
+        log_file : file collecting stdout of the tool, stderr is left on the console
+        name : job name used for progress reporting
+        timeout : seconds before the tool is killed, None to wait forever
+        progress : callable(name, line) called for every output line
+        limit : optional asyncio.Semaphore bounding concurrent tools
+
+    Returns :
+        exit code of the tool
+    """
+    name = name or os.path.basename(log_file)
+
+    if limit is None:
+        limit = asyncio.Semaphore(1)
+
+    async with limit:
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+        )
+
+        async def stream():
+            with open(log_file, "wb") as log:
+                async for raw in proc.stdout:
+                    log.write(raw)
+                    if progress is not None:
+                        progress(name, raw.decode(errors="replace").rstrip())
+            return await proc.wait()
+
+        try:
+            return await asyncio.wait_for(stream(), timeout)
+        except asyncio.TimeoutError:
+            raise ToolTimeout(f"{name} timed out after {timeout}s, see {log_file}")
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+
+
+async def _semaphore(value):
+    return asyncio.Semaphore(value)
+
+
+async def _run_tools(jobs, limit, timeout):
+    return await asyncio.gather(
+        *[
+            run_tool(args, log_file, timeout=timeout, limit=limit)
+            for args, log_file in jobs
+        ],
+        return_exceptions=True,
+    )
+
+
+class ToolRunner:
+    """
+    Runs external tools on one event loop with one cap on running tools
+
+    A regression session shares a single runner, so --max-jobs bounds all
+    the tools of the session and not only the jobs of one test.
+    """
+
+    def __init__(self, max_jobs=None, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+
+        # created on the loop of the runner, older pythons bind it at creation
+        self.limit = self.loop.run_until_complete(
+            _semaphore(max_jobs or os.cpu_count() or 1)
+        )
+
+    def run(self, jobs):
+        """
+        Runs external tools concurrently and waits for all of them
+
+        Args :
+            jobs : list of (args, log_file) pairs
+
+        Returns :
+            list of exit codes in jobs order
+        """
+        # every tool ends or is killed at its own timeout before the first
+        # error is raised, so no tool outlives the call
+        results = self.loop.run_until_complete(
+            _run_tools(jobs, self.limit, self.timeout)
+        )
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        return results
+
+    def close(self):
+        self.loop.close()
+
+
+def run_tools(jobs, max_jobs=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Runs external tools concurrently and waits for all of them
+
+    Args :
+        jobs : list of (args, log_file) pairs
+        max_jobs : max number of tools running at the same time, defaults to cpu count
+        timeout : per tool timeout in seconds
+
+    Returns :
+        list of exit codes in jobs order
+    """
+    runner = ToolRunner(max_jobs, timeout)
+
+    try:
+        return runner.run(jobs)
+    finally:
+        runner.close()
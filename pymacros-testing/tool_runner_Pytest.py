@@ -0,0 +1,117 @@
+########################################################################################################################
+## Tests of the asyncio runner for external DRC / LVS tools
+########################################################################################################################
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from tool_runner import ToolRunner, ToolTimeout, run_tool, run_tools
+
+
+def sleep_job(tmp_path, name, seconds):
+    """
+    Job of a sleep process that writes its pid first
+
+    Args :
+        tmp_path : pytest temporary directory
+        name : job name
+        seconds : sleep duration
+    """
+    pid_file = tmp_path / f"{name}.pid"
+    args = ["sh", "-c", f"echo $$ > {pid_file}; exec sleep {seconds}"]
+
+    return (args, str(tmp_path / f"{name}.log")), pid_file
+
+
+def is_running(pid_file):
+    """
+    Returns whether the process of a pid file still exists
+
+    Args :
+        pid_file : file holding the pid of the process
+    """
+    try:
+        os.kill(int(pid_file.read_text()), 0)
+    except ProcessLookupError:
+        return False
+
+    return True
+
+
+def test_exit_codes_in_jobs_order(tmp_path):
+    jobs = [
+        (["sh", "-c", f"exit {code}"], str(tmp_path / f"{i}.log"))
+        for i, code in enumerate([0, 3, 0, 1])
+    ]
+
+    assert run_tools(jobs) == [0, 3, 0, 1]
+
+
+def test_stderr_kept_out_of_the_log(tmp_path):
+    log_file = tmp_path / "tool.log"
+    args = ["sh", "-c", "echo verdict; echo warning >&2"]
+
+    assert run_tools([(args, str(log_file))]) == [0]
+    assert log_file.read_text() == "verdict\n"
+
+
+def test_timeout_kills_the_tool(tmp_path):
+    job, pid_file = sleep_job(tmp_path, "slow", 30)
+
+    start = time.perf_counter()
+    with pytest.raises(ToolTimeout):
+        run_tools([job], timeout=0.5)
+
+    assert time.perf_counter() - start < 10
+    assert not is_running(pid_file)
+
+
+def test_timeout_waits_for_the_other_tools(tmp_path):
+    slow, slow_pid = sleep_job(tmp_path, "slow", 30)
+    short, short_pid = sleep_job(tmp_path, "short", 1)
+
+    runner = ToolRunner(max_jobs=2, timeout=0.5)
+
+    try:
+        with pytest.raises(ToolTimeout):
+            runner.run([slow, short])
+
+        assert not is_running(slow_pid)
+        assert not is_running(short_pid)
+
+        # the runner stays usable for the next test of the session
+        assert runner.run([(["sh", "-c", "exit 0"], str(tmp_path / "ok.log"))]) == [0]
+    finally:
+        runner.close()
+
+
+def test_cancel_kills_the_tool(tmp_path):
+    (args, log_file), pid_file = sleep_job(tmp_path, "slow", 30)
+
+    async def cancel_when_started():
+        task = asyncio.ensure_future(run_tool(args, log_file))
+        while not pid_file.exists() or not pid_file.read_text().strip():
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_when_started())
+
+    assert not is_running(pid_file)
+
+
+def test_max_jobs_bounds_the_session(tmp_path):
+    runner = ToolRunner(max_jobs=1)
+
+    jobs = [sleep_job(tmp_path, f"job{i}", 0.3)[0] for i in range(3)]
+
+    try:
+        start = time.perf_counter()
+        assert runner.run(jobs) == [0, 0, 0]
+        assert time.perf_counter() - start >= 0.9
+    finally:
+        runner.close()
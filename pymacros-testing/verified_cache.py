@@ -0,0 +1,130 @@
+########################################################################################################################
+## Geometry fingerprints of verified-clean testcases
+########################################################################################################################
+
+import os
+import sys
+import json
+import fcntl
+import hashlib
+import tempfile
+import functools
+import klayout.db as k
+
+repo_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_path)
+
+from layoutDigest import layoutDigest  # noqa E402
+
+CACHE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "testcases", "verified_fingerprints.json"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def deck_identity(deck_dir):
+    """
+    Hashes the files of a rule deck, so a deck update invalidates the cache
+
+    Contents are hashed rather than sizes and mtimes, which checkouts and
+    copies don't keep reliably. Decks don't change during a session, so
+    every deck is hashed once per process.
+
+    Args :
+        deck_dir : rule deck directory
+    """
+    digest = hashlib.sha256()
+
+    for root, dirs, files in os.walk(deck_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, deck_dir)
+
+            with open(path, "rb") as f:
+                content = hashlib.sha256(f.read()).hexdigest()
+
+            digest.update(f"{rel} {content}\n".encode())
+
+    return digest.hexdigest()
+
+
+def testcase_fingerprint(gds_file, cdl_file=None, deck_dir=None):
+    """
+    Fingerprint of everything a drc / lvs result depends on
+
+    Args :
+        gds_file : testcase gds file path
+        cdl_file : testcase cdl file path, for lvs
+        deck_dir : rule deck directory
+    """
+    layout = k.Layout()
+    layout.read(gds_file)
+
+    digest = hashlib.sha256(layoutDigest(layout).encode())
+
+    if cdl_file is not None:
+        with open(cdl_file, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).hexdigest().encode())
+
+    if deck_dir is not None:
+        digest.update(deck_identity(deck_dir).encode())
+
+    return digest.hexdigest()
+
+
+def load_verified(cache_file=CACHE_FILE):
+    """
+    Reads the fingerprints of testcases verified clean
+
+    Args :
+        cache_file : json cache file path
+    """
+    if not os.path.isfile(cache_file):
+        return {}
+
+    with open(cache_file) as f:
+        return json.load(f)
+
+
+def is_verified(key, fingerprint, cache_file=CACHE_FILE):
+    """
+    Returns whether a testcase with the same fingerprint was verified clean
+
+    Args :
+        key : check name, like drc/<device_name>/<variant>
+        fingerprint : current testcase fingerprint
+        cache_file : json cache file path
+    """
+    return load_verified(cache_file).get(key) == fingerprint
+
+
+def mark_verified(key, fingerprint, cache_file=CACHE_FILE):
+    """
+    Stores the fingerprint of a testcase that was verified clean
+
+    Variants and shards mark testcases concurrently: the update holds a
+    lock on the cache, and the new cache replaces the old one atomically.
+
+    Args :
+        key : check name, like drc/<device_name>/<variant>
+        fingerprint : verified testcase fingerprint
+        cache_file : json cache file path
+    """
+    cache_dir = os.path.dirname(cache_file)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with open(f"{cache_file}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        verified = load_verified(cache_file)
+        verified[key] = fingerprint
+
+        fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(verified, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
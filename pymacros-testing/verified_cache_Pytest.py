@@ -0,0 +1,95 @@
+########################################################################################################################
+## Tests of the verified fingerprints cache
+########################################################################################################################
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import klayout.db as k
+
+import verified_cache
+from verified_cache import deck_identity, is_verified, load_verified, mark_verified
+
+
+def test_mark_and_check(tmp_path):
+    cache_file = str(tmp_path / "cache" / "verified.json")
+
+    assert not is_verified("drc/nwell/A", "abc", cache_file=cache_file)
+
+    mark_verified("drc/nwell/A", "abc", cache_file=cache_file)
+
+    assert is_verified("drc/nwell/A", "abc", cache_file=cache_file)
+    assert not is_verified("drc/nwell/A", "def", cache_file=cache_file)
+    assert not is_verified("drc/nwell/B", "abc", cache_file=cache_file)
+
+
+def test_concurrent_marks_are_kept(tmp_path):
+    cache_file = str(tmp_path / "verified.json")
+    keys = [f"drc/res_{i}/A" for i in range(40)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda key: mark_verified(key, key, cache_file=cache_file), keys))
+
+    assert load_verified(cache_file) == {key: key for key in keys}
+
+    # no temporary file left next to the cache
+    assert sorted(os.listdir(tmp_path)) == ["verified.json", "verified.json.lock"]
+    with open(cache_file) as f:
+        json.load(f)
+
+
+def test_deck_identity_follows_contents(tmp_path):
+    deck = tmp_path / "deck"
+    deck.mkdir()
+    (deck / "rules.drc").write_text("width 0.28")
+
+    identity = deck_identity(str(deck))
+
+    # same size and mtime, other contents
+    stat = os.stat(deck / "rules.drc")
+    (deck / "rules.drc").write_text("width 0.30")
+    os.utime(deck / "rules.drc", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    deck_identity.cache_clear()
+    assert deck_identity(str(deck)) != identity
+
+    # a copy with new mtimes keeps its identity
+    copy = tmp_path / "copy"
+    copy.mkdir()
+    (copy / "rules.drc").write_text("width 0.30")
+
+    assert deck_identity(str(copy)) == deck_identity(str(deck))
+
+
+def write_gds(gds_file, boxes):
+    """
+    Writes a one cell gds file of metal1 boxes
+
+    Args :
+        gds_file : output gds file path
+        boxes : list of (left, bottom, right, top) boxes in um
+    """
+    layout = k.Layout()
+    top = layout.create_cell("top")
+
+    for box in boxes:
+        top.shapes(layout.layer(34, 0)).insert(k.DBox(*box))
+
+    layout.write(gds_file)
+
+
+def test_testcase_fingerprint_follows_geometry(tmp_path):
+    write_gds(str(tmp_path / "one.gds"), [(0, 0, 2, 1)])
+    write_gds(str(tmp_path / "split.gds"), [(1, 0, 2, 1), (0, 0, 1, 1)])
+    write_gds(str(tmp_path / "other.gds"), [(0, 0, 2, 1.5)])
+
+    fingerprint = verified_cache.testcase_fingerprint(str(tmp_path / "one.gds"))
+
+    # same merged geometry drawn with other shapes
+    assert (
+        verified_cache.testcase_fingerprint(str(tmp_path / "split.gds")) == fingerprint
+    )
+    assert (
+        verified_cache.testcase_fingerprint(str(tmp_path / "other.gds")) != fingerprint
+    )